@@ -0,0 +1,114 @@
+"""Headless batch mode (--batch): suggestions for every record of a JSONL file."""
+import json
+import os
+
+from metrics import METRICS
+from suggestions import suggest_all
+
+
+# --- Headless batch mode -------------------------------------------------
+# Reads JSONL records (like requests.jsonl), runs the three suggestion
+# styles on each one (suggest_all) and writes the results as JSONL, in
+# input order.
+
+BATCH_TEXT_FIELDS = ('text', 'body', 'original')
+BATCH_CHUNK_SIZE = 256
+
+
+def _batch_record(line_no, line):
+    """Turn one input line into one output record."""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return {'line': line_no, 'error': f'invalid JSON: {e}'}
+    if not isinstance(record, dict):
+        return {'line': line_no, 'error': 'record is not a JSON object'}
+    text = None
+    for field in BATCH_TEXT_FIELDS:
+        if isinstance(record.get(field), str):
+            text = record[field]
+            break
+    if text is None:
+        return {'line': line_no, 'error': 'no text field found'}
+    out = {'line': line_no}
+    # keep identifying fields so results can be matched with the input
+    for key in ('request_id', 'id', 'title'):
+        if key in record:
+            out[key] = record[key]
+    out.update(suggest_all(text))
+    return out
+
+
+def _batch_chunk(chunk):
+    """Worker entry point: process a list of (line number, line) pairs.
+
+    Returns (results, metrics snapshot or None) so a worker process can
+    send what it measured back to the main process.
+    """
+    with METRICS.timer('batch_chunk_seconds'):
+        results = [_batch_record(line_no, line) for line_no, line in chunk]
+    METRICS.count('batch_records', len(results))
+    return results, (METRICS.snapshot(reset=True) if METRICS.enabled else None)
+
+
+def _read_chunks(f, chunk_size):
+    """Yield lists of (line number, line) pairs, skipping blank lines."""
+    chunk = []
+    for line_no, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        chunk.append((line_no, line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(input_path, output_path=None, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    """Process a JSONL file and write one JSON result per line.
+
+    Chunks are spread over a process pool. Only a few chunks per worker are
+    in flight at a time, so memory stays bounded no matter how big the
+    input file is. Returns the number of records written.
+    """
+    import sys
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    src = open(input_path, 'r', encoding='utf-8')
+    dst = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+    try:
+        def write_results(done):
+            nonlocal written
+            results, worker_metrics = done
+            if worker_metrics is not None:
+                METRICS.merge(worker_metrics)
+            for rec in results:
+                dst.write(json.dumps(rec, ensure_ascii=False) + '\n')
+                written += 1
+
+        chunks = _read_chunks(src, chunk_size)
+        if workers == 1:
+            # no pool needed; also handy for debugging
+            for chunk in chunks:
+                write_results((_batch_chunk(chunk)[0], None))
+            return written
+
+        max_pending = workers * 2
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_batch_chunk, chunk))
+                # wait for the oldest chunk so output stays in input order
+                if len(pending) >= max_pending:
+                    write_results(pending.popleft().result())
+            while pending:
+                write_results(pending.popleft().result())
+        return written
+    finally:
+        src.close()
+        if dst is not sys.stdout:
+            dst.close()
@@ -0,0 +1,342 @@
+"""Which words a suggestion changed, as character ranges to highlight."""
+import bisect
+import itertools
+import operator
+import re
+from collections import Counter
+
+from metrics import timed
+
+
+# --- Highlighting what a suggestion changed --------------------------------
+# Token-level diff between the original and a suggestion. It works like a
+# patience diff: tokens that occur exactly once on both sides are matched
+# first (longest increasing run), and the gaps between them are diffed the
+# same way. When no single token is unique, short runs of tokens are used
+# instead. Only small gaps without anchors use a plain Myers diff, so long
+# essays take roughly linear time and memory instead of quadratic. Whole
+# sentences are diffed the same way first, so only the tokens of changed
+# sentences are looked at one by one.
+
+# a word or a run of punctuation; splitting on it keeps the whitespace
+# between tokens for the offsets, but only tokens are compared (whitespace
+# changes would be invisible anyway)
+_DIFF_TOKEN_RE = re.compile(r'(\w+|[^\w\s]+)')
+DIFF_SMALL_GAP = 24  # gaps this short (in tokens) go straight to Myers
+# when no single token is unique, anchors are runs of tokens, long enough
+# that the vocabulary allows this many distinct runs per token (or at most
+# DIFF_ANCHOR_MAX_WIDTH tokens)
+DIFF_ANCHOR_ROOM = 4
+DIFF_ANCHOR_MAX_WIDTH = 16
+DIFF_MYERS_MAX_TOKENS = 2000  # larger gaps with no anchors count as replaced
+
+
+def _longest_increasing(pairs):
+    """Longest chain of (i, j) pairs (sorted by i) whose j values increase
+    (patience sorting)."""
+    tails = []  # tails[k] = index in pairs of the smallest tail of a chain of length k+1
+    tail_js = []
+    prev = [-1] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tail_js, j)
+        if pos:
+            prev[k] = tails[pos - 1]
+        if pos == len(tails):
+            tails.append(k)
+            tail_js.append(j)
+        else:
+            tails[pos] = k
+            tail_js[pos] = j
+    chain = []
+    k = tails[-1] if tails else -1
+    while k >= 0:
+        chain.append(pairs[k])
+        k = prev[k]
+    chain.reverse()
+    return chain
+
+
+def _run_keys(ids, width, base):
+    """One int per run of `width` ids (each below `base`); equal runs get
+    equal keys and no others do."""
+    count = len(ids) - width + 1
+    keys = ids[:count]
+    for k in range(1, width):
+        keys = list(map(operator.add, map(base.__mul__, keys), ids[k:k + count]))
+    return keys
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi, width=1):
+    """Start positions (i, j) of runs of `width` tokens that occur exactly
+    once in a[alo:ahi] and once in b[blo:bhi], reduced to the longest chain
+    that is increasing on both sides and does not overlap."""
+    if width == 1:
+        keys_a = a[alo:ahi]
+        keys_b = b[blo:bhi]
+    else:
+        # number the region's tokens 0..n-1 and fold each run into one int,
+        # which hashes far faster than a tuple of tokens
+        local = dict(zip(dict.fromkeys(itertools.chain(a[alo:ahi], b[blo:bhi])), itertools.count()))
+        keys_a = _run_keys(list(map(local.__getitem__, a[alo:ahi])), width, len(local))
+        keys_b = _run_keys(list(map(local.__getitem__, b[blo:bhi])), width, len(local))
+    # count in C, then look positions up only for the keys that occur once
+    # on each side (the last position of such a key is its only one)
+    counts_a = Counter(keys_a)
+    counts_b = Counter(keys_b)
+    unique = [key for key, count in counts_a.items() if count == 1 and counts_b.get(key) == 1]
+    if not unique:
+        return []
+    last_a = dict(zip(keys_a, range(alo, ahi)))
+    last_b = dict(zip(keys_b, range(blo, bhi)))
+    # Counter keeps first-seen order, so the pairs are already sorted by i
+    pairs = list(zip(map(last_a.__getitem__, unique), map(last_b.__getitem__, unique)))
+    js = [j for _, j in pairs]
+    if js == sorted(js):
+        # the usual case: the unique tokens kept their order
+        chain = pairs
+    else:
+        chain = _longest_increasing(pairs)
+    if width == 1:
+        return chain
+    anchors = []
+    end_a = end_b = -1
+    for i, j in chain:
+        if i >= end_a and j >= end_b:
+            anchors.append((i, j))
+            end_a, end_b = i + width, j + width
+    return anchors
+
+
+def _myers(a, b, alo, ahi, blo, bhi, ops):
+    """Plain Myers O(ND) diff of a small region, appending opcodes to `ops`."""
+    n = ahi - alo
+    m = bhi - blo
+    if n + m > DIFF_MYERS_MAX_TOKENS:
+        ops.append(('replace', alo, ahi, blo, bhi))
+        return
+    offset = n + m + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(n + m + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    # walk back through the saved rows to recover the edit script
+    steps = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        row = trace[d]
+        k = x - y
+        if k == -d or (k != d and row[offset + k - 1] < row[offset + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = row[offset + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            steps.append(('equal', x, y))
+        if x > prev_x:
+            x -= 1
+            steps.append(('delete', x, y))
+        else:
+            y -= 1
+            steps.append(('insert', x, y))
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        steps.append(('equal', x, y))
+    for tag, x, y in reversed(steps):
+        if tag == 'equal':
+            ops.append(('equal', alo + x, alo + x + 1, blo + y, blo + y + 1))
+        elif tag == 'delete':
+            ops.append(('delete', alo + x, alo + x + 1, blo + y, blo + y))
+        else:
+            ops.append(('insert', alo + x, alo + x, blo + y, blo + y + 1))
+
+
+def _diff_region(a, b, alo, ahi, blo, bhi, ops):
+    # equal tokens at both ends need no search
+    start_a, start_b = alo, blo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    if alo > start_a:
+        ops.append(('equal', start_a, alo, start_b, blo))
+    end_a, end_b = ahi, bhi
+    while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+    if alo == ahi or blo == bhi:
+        if alo < ahi:
+            ops.append(('delete', alo, ahi, blo, blo))
+        elif blo < bhi:
+            ops.append(('insert', alo, alo, blo, bhi))
+    else:
+        anchors = []
+        width = 1
+        if (ahi - alo) + (bhi - blo) > DIFF_SMALL_GAP:
+            anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+            if not anchors:
+                # no single token is unique (a long text with a small vocabulary):
+                # runs of a few tokens usually are
+                vocabulary = len(set(a[alo:ahi]))
+                width = 2
+                while (width < DIFF_ANCHOR_MAX_WIDTH
+                       and vocabulary ** width < DIFF_ANCHOR_ROOM * (ahi - alo)):
+                    width += 1
+                anchors = _unique_anchors(a, b, alo, ahi, blo, bhi, width)
+        if anchors:
+            i, j = alo, blo
+            for ai, bj in anchors:
+                if ai > i or bj > j:
+                    _diff_region(a, b, i, ai, j, bj, ops)
+                ops.append(('equal', ai, ai + width, bj, bj + width))
+                i, j = ai + width, bj + width
+            _diff_region(a, b, i, ahi, j, bhi, ops)
+        elif set(a[alo:ahi]).isdisjoint(b[blo:bhi]):
+            # the usual case between anchors: a word or phrase was rewritten
+            # and nothing in it was kept
+            ops.append(('replace', alo, ahi, blo, bhi))
+        else:
+            _myers(a, b, alo, ahi, blo, bhi, ops)
+    if ahi < end_a:
+        ops.append(('equal', ahi, end_a, bhi, end_b))
+
+
+def _sentence_starts(ids, end_ids):
+    """Token positions where each sentence starts, plus len(ids); a
+    sentence ends after any token in `end_ids`."""
+    ends = itertools.compress(range(1, len(ids) + 1), map(end_ids.__contains__, ids))
+    starts = [0]
+    starts.extend(ends)
+    if starts[-1] != len(ids):
+        starts.append(len(ids))
+    return starts
+
+
+def diff_tokens(a, b):
+    """Opcodes (tag, i1, i2, j1, j2) turning token list `a` into `b`, like
+    difflib's get_opcodes(), with neighbouring opcodes of one kind merged."""
+    # compare small ints instead of strings from here on
+    ids = dict(zip(dict.fromkeys(itertools.chain(a, b)), itertools.count()))
+    a = list(map(ids.__getitem__, a))
+    b = list(map(ids.__getitem__, b))
+    end_ids = {n for token, n in ids.items() if token.endswith(('.', '!', '?'))}
+    a_starts = _sentence_starts(a, end_ids)
+    b_starts = _sentence_starts(b, end_ids)
+    # diff whole sentences first, so the tokens of unchanged sentences are
+    # never looked at again; then diff the tokens of each changed stretch
+    a_sentences = [tuple(a[i:j]) for i, j in zip(a_starts, a_starts[1:])]
+    b_sentences = [tuple(b[i:j]) for i, j in zip(b_starts, b_starts[1:])]
+    sentence_ids = dict(zip(dict.fromkeys(itertools.chain(a_sentences, b_sentences)),
+                            itertools.count()))
+    sentence_ops = []
+    _diff_region(list(map(sentence_ids.__getitem__, a_sentences)),
+                 list(map(sentence_ids.__getitem__, b_sentences)),
+                 0, len(a_sentences), 0, len(b_sentences), sentence_ops)
+    ops = []
+    i = j = 0  # start of the changed stretch, in sentences
+    for tag, i1, i2, j1, j2 in sentence_ops:
+        if tag == 'equal':
+            _diff_region(a, b, a_starts[i], a_starts[i1], b_starts[j], b_starts[j1], ops)
+            ops.append(('equal', a_starts[i1], a_starts[i2], b_starts[j1], b_starts[j2]))
+            i, j = i2, j2
+    _diff_region(a, b, a_starts[i], len(a), b_starts[j], len(b), ops)
+    merged = []
+    for op in ops:
+        if op[1] == op[2] and op[3] == op[4]:
+            continue
+        if merged and (merged[-1][0] == 'equal') == (op[0] == 'equal'):
+            last = merged[-1]
+            tag = last[0] if last[0] == op[0] else 'replace'
+            merged[-1] = (tag, last[1], op[2], last[3], op[4])
+        else:
+            merged.append(op)
+    return merged
+
+
+@timed('diff_seconds')
+def diff_ranges(original, suggestion):
+    """Character ranges that changed: (removed from `original`, added in `suggestion`).
+
+    Each is a list of (start, end) offsets, ready to be highlighted.
+    """
+    # [space, token, space, token, ..., trailing space]
+    a_parts = _DIFF_TOKEN_RE.split(original)
+    b_parts = _DIFF_TOKEN_RE.split(suggestion)
+    a = a_parts[1::2]
+    b = b_parts[1::2]
+    # match case-insensitively, so a capital added at a sentence start does
+    # not break up long equal runs; such tokens are still reported below
+    changes = []
+    for tag, i1, i2, j1, j2 in diff_tokens(list(map(str.lower, a)), list(map(str.lower, b))):
+        if tag != 'equal':
+            spans = [(i1, i2, j1, j2)]
+        elif a[i1:i2] != b[j1:j2]:
+            shift = j1 - i1
+            spans = [(i, i + 1, i + shift, i + shift + 1)
+                     for i in itertools.compress(range(i1, i2), map(operator.ne, a[i1:i2], b[j1:j2]))]
+        else:
+            continue
+        for span in spans:
+            if changes and changes[-1][1] == span[0] and changes[-1][3] == span[2]:
+                changes[-1] = (changes[-1][0], span[1], changes[-1][2], span[3])
+            else:
+                changes.append(span)
+    return (_token_ranges(a_parts, [(i1, i2) for i1, i2, _, _ in changes]),
+            _token_ranges(b_parts, [(j1, j2) for _, _, j1, j2 in changes]))
+
+
+def _token_ranges(parts, spans):
+    """Character ranges of the token spans (i1, i2) over split `parts`,
+    skipping empty spans. Offsets are summed only up to each span."""
+    ranges = []
+    pos = 0  # characters before parts[done]
+    done = 0
+    for i1, i2 in spans:
+        if i1 == i2:
+            continue
+        start = 2 * i1 + 1  # index of token i1 in parts
+        pos += sum(map(len, parts[done:start]))
+        end_pos = pos + sum(map(len, parts[start:2 * i2]))
+        ranges.append((pos, end_pos))
+        pos, done = end_pos, 2 * i2
+    return ranges
+
+
+def text_indices(pieces, ranges, shift=0):
+    """Turn (start, end) character offsets into Tk "line.col" indices.
+
+    `pieces` are the strings that make up the widget's text, in order, and
+    `shift` is added to every offset. Returns a flat list start1, end1,
+    start2, end2, ... for a single tag_add call.
+    """
+    line_starts = [0]
+    piece_start = 0
+    for piece in pieces:
+        pos = piece.find('\n')
+        while pos != -1:
+            line_starts.append(piece_start + pos + 1)
+            pos = piece.find('\n', pos + 1)
+        piece_start += len(piece)
+    indices = []
+    for start, end in ranges:
+        for offset in (start + shift, end + shift):
+            line = bisect.bisect_right(line_starts, offset) - 1
+            indices.append(f'{line + 1}.{offset - line_starts[line]}')
+    return indices
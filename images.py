@@ -0,0 +1,265 @@
+"""Loading, scaling and caching images (Pillow and cairosvg are optional)."""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import METRICS
+
+LOGO_PATH = os.path.join('assets', 'lingrow_logo.png')
+# every size the logo is shown at (window icon, header), made from one decode
+LOGO_BOXES = ((64, 64), (48, 48))
+IMAGE_CACHE_BYTES = 32 * 1024 * 1024  # memory budget for decoded images
+# Folder for thumbnails saved between runs; off unless LINGROW_THUMB_CACHE is set
+THUMB_CACHE_DIR = os.environ.get('LINGROW_THUMB_CACHE') or None
+
+
+# --- Optional image libraries ------------------------------------------------
+# Pillow and cairosvg are only imported the first time an image is needed,
+# which keeps them off the startup path. A failed import is remembered so
+# it is not retried for every icon.
+
+_optional_modules = {}
+
+
+def _import_optional(name, importer):
+    module = _optional_modules.get(name)
+    if module is None:
+        try:
+            module = importer()
+        except ImportError as e:
+            module = e
+        _optional_modules[name] = module
+    if isinstance(module, ImportError):
+        raise module
+    return module
+
+
+def load_pil():
+    """Return (Image, ImageTk) from Pillow; raises ImportError without it."""
+    def importer():
+        from PIL import Image, ImageTk
+        return Image, ImageTk
+    return _import_optional('PIL', importer)
+
+
+def load_cairosvg():
+    """Return the cairosvg module; raises ImportError without it."""
+    def importer():
+        import cairosvg
+        return cairosvg
+    return _import_optional('cairosvg', importer)
+
+
+# --- Image cache ------------------------------------------------------------
+# Decoding a PNG (or a big phone photo) is slow, so decoded images and their
+# thumbnails are kept in memory, keyed by (path, mtime, file size, box).
+# When the file changes its mtime/size change too, so old entries are never
+# used again and simply fall out of the cache.
+
+def open_image_file(path, max_size=None):
+    """Decode an image file with Pillow (SVG needs cairosvg).
+
+    With `max_size` (w, h) the image may come back smaller, but never
+    smaller than twice that size: JPEGs are decoded at reduced resolution
+    (draft mode), and other formats are shrunk by a whole factor right
+    after decoding (reduce), so less memory stays in use.
+    """
+    Image, _ = load_pil()
+    if path.lower().endswith('.svg'):
+        cairosvg = load_cairosvg()
+        png_bytes = cairosvg.svg2png(url=path)
+        img = Image.open(io.BytesIO(png_bytes))
+    else:
+        img = Image.open(path)
+    if max_size is not None:
+        target = (max_size[0] * 2, max_size[1] * 2)
+        if img.format == 'JPEG':
+            img.draft(None, target)
+        img.load()
+        factor = min(img.size[0] // target[0], img.size[1] // target[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+        return img
+    img.load()
+    return img
+
+
+def _image_bytes(img):
+    """Rough number of bytes an image uses in memory."""
+    w, h = img.size
+    return w * h * len(img.getbands())
+
+
+class ImageCache:
+    """LRU cache of decoded images and thumbnails with a byte budget.
+
+    thumbnails() decodes a file at most once for all the boxes it is asked
+    for, at the smallest resolution those boxes allow (see
+    open_image_file). image() keeps the full decoded image (if it is small
+    enough), and thumbnails() uses it when it is there. If `disk_dir` is
+    set, thumbnails are also saved there as PNG files and reused between
+    runs.
+    """
+
+    def __init__(self, max_bytes=IMAGE_CACHE_BYTES, disk_dir=THUMB_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.items = OrderedDict()  # key -> (image, bytes)
+        self.used = 0
+        self.decodes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def file_key(path):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    def _get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            self.items.move_to_end(key)
+            return item[0]
+
+    def _put(self, key, img):
+        size = _image_bytes(img)
+        with self.lock:
+            if size > self.max_bytes:
+                return
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.used -= old[1]
+            self.items[key] = (img, size)
+            self.used += size
+            # drop the least recently used images until we fit the budget
+            while self.used > self.max_bytes and self.items:
+                _, (_, dropped) = self.items.popitem(last=False)
+                self.used -= dropped
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, digest + '.png')
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            Image, _ = load_pil()
+            img = Image.open(path)
+            img.load()
+            return img
+        except Exception:
+            return None
+
+    def _save_to_disk(self, key, img):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = path + '.tmp'
+            img.save(tmp_path, format='PNG')
+            os.replace(tmp_path, path)
+        except Exception:
+            # the disk cache is only a speed-up; ignore write problems
+            pass
+
+    def image(self, path):
+        """The full decoded image for `path`."""
+        key = self.file_key(path) + (None,)
+        img = self._get(key)
+        if img is not None:
+            self.hits += 1
+            return img
+        self.misses += 1
+        self.decodes += 1
+        with METRICS.timer('image_decode_seconds'):
+            img = open_image_file(path)
+        # only keep the full image if it leaves room for other entries
+        if _image_bytes(img) <= self.max_bytes // 4:
+            self._put(key, img)
+        return img
+
+    def thumbnails(self, path, boxes, resample=None):
+        """Return one thumbnail per box (a list, in the same order)."""
+        base = self.file_key(path)
+        results = {}
+        missing = []
+        for box in boxes:
+            key = base + (tuple(box), resample)
+            img = self._get(key)
+            if img is None:
+                img = self._load_from_disk(key)
+                if img is not None:
+                    self._put(key, img)
+            if img is None:
+                missing.append((box, key))
+            else:
+                self.hits += 1
+                results[tuple(box)] = img
+        if missing:
+            self.misses += len(missing)
+            source = self._get(base + (None,))
+            if source is None:
+                # decode only as big as the largest box needs; the reduced
+                # image is not cached, the thumbnails are
+                largest = (max(box[0] for box, _ in missing), max(box[1] for box, _ in missing))
+                self.decodes += 1
+                with METRICS.timer('image_decode_seconds'):
+                    source = open_image_file(path, largest)
+            for box, key in missing:
+                thumb = source.copy()
+                if resample is None:
+                    thumb.thumbnail(tuple(box))
+                else:
+                    thumb.thumbnail(tuple(box), resample)
+                self._put(key, thumb)
+                self._save_to_disk(key, thumb)
+                results[tuple(box)] = thumb
+        return [results[tuple(box)] for box in boxes]
+
+    def thumbnail(self, path, box, resample=None):
+        return self.thumbnails(path, [box], resample)[0]
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.used = 0
+
+
+_image_cache = None
+
+
+def get_image_cache():
+    """Return the shared ImageCache, creating it on first use."""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache()
+    return _image_cache
+
+
+def _collect_gauges(metrics):
+    if _image_cache is not None:
+        metrics.gauge('image_cache_decodes', _image_cache.decodes)
+        metrics.gauge('image_cache_bytes', _image_cache.used)
+
+
+METRICS.add_gauge_source(_collect_gauges)
+
+
+def logo_thumbnail(box):
+    """The logo fitted into `box`, one of LOGO_BOXES.
+
+    All the boxes are asked for together, so the logo is decoded once no
+    matter which one is needed first.
+    """
+    thumbs = get_image_cache().thumbnails(LOGO_PATH, LOGO_BOXES)
+    return thumbs[LOGO_BOXES.index(box)]
@@ -13,13 +13,46 @@ Run with:
 """
 import json
 import os
+import queue
 import time
-import io
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import filedialog, messagebox
 
-SAVE_FILE = "saved_texts.json"
+# Reference point for the time-to-first-frame measurement (taken before the
+# modules below load their rules)
+STARTUP_TIME = time.perf_counter()
+
+# Everything that is not part of the window lives in its own module:
+#   suggestions.py   the three styles (rules from rulepack.py)
+#   result_cache.py  finished suggestions remembered between runs
+#   diff.py          which words a suggestion changed
+#   storage.py       saved entries and the index for searching them
+#   images.py        loading and scaling images
+#   batch.py, service.py   the --batch and --serve modes
+#   metrics.py       --metrics and --profile
+from batch import BATCH_CHUNK_SIZE, run_batch
+from diff import diff_ranges, text_indices
+from images import LOGO_PATH, get_image_cache, load_pil, logo_thumbnail
+from metrics import METRICS, enable_metrics, enable_profiling, timed
+from result_cache import cached_suggestion, get_worker_pool
+from service import run_service
+from storage import TextSegments, get_index, loaded_index, save_entry, split_segments
+from suggestions import suggest_all
+
 DEFAULT_IMAGE = "lingrow_mockup.png"
+# Live preview: wait for a pause in typing, then show the result.
+# Target: the preview appears within about 300 ms of the last keystroke.
+LIVE_PREVIEW_DEBOUNCE_MS = 250
+BACKGROUND_POLL_MS = 15  # how often the window checks for finished work
+NAV_RESIZE_DEBOUNCE_MS = 30  # wait this long after the last resize before moving nav items
+LARGE_OUTPUT_CHARS = 200_000  # longer suggestions are shown a chunk at a time
+HISTORY_ROW_HEIGHT = 44  # pixels per row in the history browser
+HISTORY_PAGE_SIZE = 100  # saved entries read from disk at a time
+HISTORY_CACHED_PAGES = 8  # pages kept in memory while scrolling
+# All nav icons packed into one image (made by scripts/generate_assets.py);
+# the JSON file lists each icon's rectangle. ICON_PATHS is the fallback.
+ICON_ATLAS_MANIFEST = 'icons/nav_atlas.json'
 ICON_PATHS = {
     'home': 'icons/home.png',
     'explore': 'icons/explore.png',
@@ -28,69 +61,250 @@ ICON_PATHS = {
 }
 
 
-def professional_suggestion(text: str) -> str:
-    replacements = {
-        "gonna": "going to",
-        "wanna": "want to",
-        "ok": "okay",
-        "yeah": "yes",
-        "thanks": "thank you",
-    }
-    result = text
-    for k, v in replacements.items():
-        result = result.replace(k, v)
-        result = result.replace(k.capitalize(), v.capitalize())
-    # Capitalize sentence starts (very simple rule)
-    sentences = [s.strip().capitalize() for s in result.split('.')]
-    return '. '.join(s for s in sentences if s)
-
-
-def neutral_suggestion(text: str) -> str:
-    t = " ".join(text.split())
-    # Very small cleanup
-    t = t.replace(' ,', ',').replace(' .', '.')
-    return t
-
-
-def cultural_suggestion(text: str) -> str:
-    cultural_map = {
-        "buddy": "friend",
-        "dude": "person",
-        "mate": "friend (UK/AU)",
-    }
-    t = text
-    for k, v in cultural_map.items():
-        t = t.replace(k, v)
-        t = t.replace(k.capitalize(), v.capitalize())
-    return t + "\n\nNote: Consider local greetings depending on the culture."
-
-
-def load_saved():
-    if not os.path.exists(SAVE_FILE):
-        return []
-    try:
-        with open(SAVE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return []
-
-
-def save_entry(title, original, suggestions):
-    data = load_saved()
-    entry = {
-        'title': title,
-        'original': original,
-        'suggestions': suggestions,
-        'timestamp': time.time(),
-    }
-    data.append(entry)
-    with open(SAVE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# --- Background work for the window -------------------------------------
+# Suggestions run on a worker thread so typing never freezes the window.
+# Tk widgets may only be touched from the main thread, so finished results
+# are handed back through a queue that the main thread polls with after().
+
+class BackgroundRunner:
+    """Runs the latest request on the worker pool and drops stale results.
+
+    Every request gets a new generation number. A result is only shown if
+    no newer request was made while it was running.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.generation = 0
+        self.job = None  # pending after() id for a debounced request
+        self.future = None
+        self.results = queue.Queue()
+        self.polling = False
+        self.closed = False
+
+    def request(self, prepare, delay_ms=0):
+        """Run `prepare` on the main thread after `delay_ms` (debounced).
+
+        `prepare` returns None to do nothing, or a pair (work, on_done):
+        `work()` runs on the worker thread and `on_done(result, seconds)` is
+        called on the main thread with its result.
+        """
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+        self.job = self.root.after(delay_ms, self._start, prepare)
+
+    def _start(self, prepare):
+        self.job = None
+        if self.closed:
+            return
+        job = prepare()
+        if job is None:
+            return
+        work, on_done = job
+        self.generation += 1
+        generation = self.generation
+        # a request that has not started yet is no longer needed
+        if self.future is not None:
+            self.future.cancel()
+        started = time.perf_counter()
+        future = get_worker_pool().submit(work)
+        future.add_done_callback(lambda f: self.results.put((generation, started, on_done, f)))
+        self.future = future
+        if not self.polling:
+            self.polling = True
+            self.root.after(BACKGROUND_POLL_MS, self._poll)
+
+    def _poll(self):
+        if self.closed:
+            self.polling = False
+            return
+        while True:
+            try:
+                generation, started, on_done, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation or future.cancelled():
+                continue  # stale: a newer request was made
+            try:
+                result = future.result()
+            except Exception as e:
+                result = f'Error: {e}'
+            on_done(result, time.perf_counter() - started)
+        if self.future is not None and not self.future.done() or not self.results.empty():
+            self.root.after(BACKGROUND_POLL_MS, self._poll)
+        else:
+            self.polling = False
+
+    def cancel(self):
+        """Forget pending work, e.g. when the window is closed."""
+        self.closed = True
+        self.generation += 1
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        if self.future is not None:
+            self.future.cancel()
+
+
+# --- History browser ------------------------------------------------------
+# A scrolling list over every saved entry. Only the rows on screen exist as
+# canvas items: a small pool of rows is moved and relabeled while scrolling.
+# Entries are read from the journal a page at a time (through the search
+# index's offsets), and only a few pages are kept in memory. Loading the
+# index the first time can take seconds, so it happens on the worker thread
+# while the window says so.
+
+class HistoryBrowser:
+    def __init__(self, root, index=None, bg='#fde8e8', card='#fff6f6', accent='#7fa6ad'):
+        self.index = index or loaded_index()  # None until the shared index is loaded
+        self.card = card
+        self.accent = accent
+        self.top = tk.Toplevel(root)
+        self.top.title('Saved texts')
+        self.top.geometry('420x600')
+        self.top.configure(bg=bg)
+        self.header = tk.Label(self.top, text='', anchor='w', bg=bg, fg=accent, font=('Helvetica', 12, 'bold'))
+        self.header.pack(fill='x', padx=8, pady=6)
+
+        body = tk.Frame(self.top, bg=bg)
+        body.pack(fill='both', expand=True, padx=8, pady=(0, 8))
+        self.canvas = tk.Canvas(body, bg=bg, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(body, orient='vertical', command=self.on_scrollbar)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set, yscrollincrement=1)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self.pages = OrderedDict()  # page number -> [SavedRecord], least recently used first
+        self.rows = []  # pool of (background, title, snippet) canvas item ids
+        self.row_of_slot = []  # which row each pool slot shows now (-1 = none)
+        self.total = -1
+
+        self.canvas.bind('<Configure>', lambda e: self.render())
+        # only on the canvas: the Toplevel would get the same event again
+        self.canvas.bind('<MouseWheel>', self.on_wheel)
+        self.canvas.bind('<Button-4>', lambda e: self.scroll_rows(-3))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll_rows(3))
+        self.canvas.tag_bind('row', '<Button-1>', self.on_click)
+        if self.index is None:
+            self.header.config(text='Loading saved texts...')
+            self.runner = BackgroundRunner(root)
+            self.runner.request(lambda: (get_index, self.on_index_loaded))
+            self.top.bind('<Destroy>', self.on_destroy)
+        else:
+            self.render()
+
+    def on_index_loaded(self, index, seconds):
+        if isinstance(index, str):
+            self.header.config(text=index)  # the runner's 'Error: ...'
+            return
+        self.index = index
+        self.render()
+
+    def on_destroy(self, event):
+        if event.widget is self.top:
+            self.runner.cancel()
+
+    # scrolling: move the view, then draw the rows that are now visible
+    def on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self.render()
+
+    def on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def scroll_rows(self, rows):
+        self.canvas.yview_scroll(rows * HISTORY_ROW_HEIGHT, 'units')
+        self.render()
+
+    def record(self, row):
+        """The SavedRecord shown at `row` (0 = newest), reading its page if needed."""
+        page_no, pos = divmod(row, HISTORY_PAGE_SIZE)
+        page = self.pages.get(page_no)
+        if page is None:
+            try:
+                page = self.index.page(page_no * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE)
+            except (OSError, IndexError):
+                page = []
+            self.pages[page_no] = page
+            if len(self.pages) > HISTORY_CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_no)
+        return page[pos] if pos < len(page) else None
+
+    def _ensure_rows(self, needed, width):
+        c = self.canvas
+        while len(self.rows) < needed:
+            tag = f'slot{len(self.rows)}'
+            self.rows.append((
+                c.create_rectangle(0, 0, 0, 0, fill=self.card, outline='#f3d0d0', tags=('row', tag)),
+                c.create_text(0, 0, text='', anchor='nw', font=('Helvetica', 11, 'bold'), fill=self.accent, tags=('row', tag)),
+                c.create_text(0, 0, text='', anchor='nw', font=('Helvetica', 10), fill='#555555', tags=('row', tag)),
+            ))
+            self.row_of_slot.append(-1)
+        for bg_item, _, snippet_item in self.rows:
+            c.itemconfig(snippet_item, width=max(1, width - 20))
+
+    def render(self):
+        if self.index is None:
+            return  # still loading
+        c = self.canvas
+        total = self.index.count()
+        width = c.winfo_width()
+        height = c.winfo_height()
+        if total != self.total:
+            # new entries were saved: rows moved down, so cached pages are stale
+            self.total = total
+            self.pages.clear()
+            self.row_of_slot = [-1] * len(self.row_of_slot)
+            c.configure(scrollregion=(0, 0, width, max(total * HISTORY_ROW_HEIGHT, 1)))
+            self.header.config(text=f'{total} saved texts' if total else 'No saved texts yet.')
+        if width <= 1 or height <= 1:
+            return
+        # one spare row for the partly visible one at the bottom
+        self._ensure_rows(height // HISTORY_ROW_HEIGHT + 2, width)
+        first = max(0, int(c.canvasy(0)) // HISTORY_ROW_HEIGHT)
+        for slot, (bg_item, title_item, snippet_item) in enumerate(self.rows):
+            row = first + slot
+            if row >= total:
+                c.itemconfig(f'slot{slot}', state='hidden')
+                self.row_of_slot[slot] = -1
+                continue
+            y = row * HISTORY_ROW_HEIGHT
+            c.coords(bg_item, 0, y + 2, width - 1, y + HISTORY_ROW_HEIGHT - 2)
+            c.coords(title_item, 10, y + 5)
+            c.coords(snippet_item, 10, y + 22)
+            if self.row_of_slot[slot] != row:
+                # only relabel a slot when it shows a different row
+                self.row_of_slot[slot] = row
+                rec = self.record(row)
+                title = rec.title if rec else ''
+                if rec and rec.timestamp:
+                    title += time.strftime('  ·  %Y-%m-%d %H:%M', time.localtime(rec.timestamp))
+                snippet = ' '.join(rec.original.split()[:20]) if rec else ''
+                if len(snippet) > 70:
+                    snippet = snippet[:67] + '...'
+                c.itemconfig(title_item, text=title)
+                c.itemconfig(snippet_item, text=snippet)
+            c.itemconfig(f'slot{slot}', state='normal')
+
+    def on_click(self, event):
+        row = int(self.canvas.canvasy(event.y)) // HISTORY_ROW_HEIGHT
+        rec = self.record(row)
+        if rec is None:
+            return
+        suggestions = rec.suggestions
+        if isinstance(suggestions, dict):
+            suggestions = '\n\n'.join(f'{k}: {v}' for k, v in suggestions.items())
+        messagebox.showinfo(rec.title, f'{rec.original}\n\n{suggestions or ""}', parent=self.top)
 
 
 class LingrowApp:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, eager=False):
         self.root = root
+        # eager=True builds every screen and decodes every image before the
+        # first frame (the old way); useful to compare startup times
+        self.eager = eager
         root.title('Lingrow')
         root.geometry('420x780')
         # Colors inspired by your mockup
@@ -102,6 +316,7 @@ class LingrowApp:
         # Image state
         self.image_path = None
         self.tk_image = None
+        self.image_runner = None  # decodes images picked with "Load Image"
         self.pill_hover = False
 
         # Main container
@@ -113,49 +328,113 @@ class LingrowApp:
         self.profile_frame = tk.Frame(self.container, bg=self.bg)
 
         self.build_home()
-        self.build_profile()
+        # the profile screen is built the first time it is shown
+        self.profile_built = False
+        if eager:
+            self.build_profile()
 
         # Bottom navigation (canvas with icons + rounded center pill)
         self.nav_canvas = tk.Canvas(root, height=80, bg=self.bg, highlightthickness=0)
         self.nav_canvas.pack(side='bottom', fill='x')
-        # redraw nav when size changes
-        self.nav_canvas.bind('<Configure>', lambda e: self.draw_nav())
+        # how long each kind of nav update takes: name -> [count, total seconds]
+        self.nav_frame_times = {}
+        self.nav_items = {}
+        self.nav_size = None
+        self.nav_resize_job = None
+        # move the nav items when the size changes (debounced)
+        self.nav_canvas.bind('<Configure>', self.on_nav_configure)
 
         # try to load nav icons from ICON_PATHS (user can add files under icons/)
         self.icon_images = {}
-        self.load_nav_icons()
+        if eager:
+            self.load_nav_icons()
+        # create the nav items once; later updates only move or recolor them
+        # (emoji stand in for the icons until they are loaded)
+        self.build_nav()
+        if not eager:
+            # decode images once the window is up, one step per idle moment
+            root.after_idle(self.load_deferred_images)
+
+        if os.environ.get('LINGROW_NAV_STATS'):
+            root.protocol('WM_DELETE_WINDOW', self.close_with_nav_stats)
 
         self.show_home()
 
+    def _record_nav_time(self, name, start):
+        elapsed = time.perf_counter() - start
+        stats = self.nav_frame_times.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        METRICS.observe('nav_update_seconds', elapsed, event=name)
+
+    def nav_frame_report(self):
+        """Average milliseconds per nav update, by kind of event."""
+        return {name: round(total / count * 1000, 4)
+                for name, (count, total) in self.nav_frame_times.items() if count}
+
+    def close_with_nav_stats(self):
+        print('nav frame times (ms):', self.nav_frame_report())
+        self.root.destroy()
+
+    def build_nav(self):
+        """Create the nav canvas items and their bindings (only once)."""
+        start = time.perf_counter()
+        c = self.nav_canvas
+        items = self.nav_items = {}
+
+        # Center rounded pill, tagged so hover/click work without extra overlays
+        pill_color = self.accent
+        items['pill'] = [
+            c.create_oval(0, 0, 0, 0, fill=pill_color, outline='', tags=('pill',)),
+            c.create_oval(0, 0, 0, 0, fill=pill_color, outline='', tags=('pill',)),
+            c.create_rectangle(0, 0, 0, 0, fill=pill_color, outline='', tags=('pill',)),
+        ]
+        # Icons: an image if one was loaded, otherwise an emoji
+        fallbacks = {'home': '🏠', 'explore': '🌍', 'write': '✍️', 'profile': '👤'}
+        for key, emoji in fallbacks.items():
+            if key in self.icon_images:
+                items[key] = c.create_image(0, 0, image=self.icon_images[key], tags=(key,), anchor='center')
+            else:
+                fill = 'white' if key == 'write' else 'black'
+                items[key] = c.create_text(0, 0, text=emoji, font=('Helvetica', 18), fill=fill, tags=(key,), anchor='center')
+
+        c.tag_bind('home', '<Button-1>', lambda e: self.show_home())
+        c.tag_bind('explore', '<Button-1>', lambda e: messagebox.showinfo('Explore', 'Explore clicked'))
+        c.tag_bind('write', '<Button-1>', lambda e: self.open_write_popup())
+        c.tag_bind('profile', '<Button-1>', lambda e: self.show_profile())
+        # bind the pill shapes for hover and clicks (no transparent overlay needed)
+        c.tag_bind('pill', '<Button-1>', self.on_pill_click)
+        c.tag_bind('pill', '<Enter>', self.on_pill_enter)
+        c.tag_bind('pill', '<Leave>', self.on_pill_leave)
+        self._record_nav_time('build', start)
+
+    def on_nav_configure(self, event):
+        size = (event.width, event.height)
+        if size == self.nav_size:
+            return
+        self.nav_size = size
+        if self.nav_resize_job is not None:
+            self.root.after_cancel(self.nav_resize_job)
+        # lay out right away the first time, then wait for resizing to settle
+        delay = NAV_RESIZE_DEBOUNCE_MS if self.nav_frame_times.get('layout') else 0
+        self.nav_resize_job = self.root.after(delay, self.draw_nav)
+
     def draw_nav(self):
+        """Move the existing nav items to fit the current canvas size."""
+        self.nav_resize_job = None
+        start = time.perf_counter()
         c = self.nav_canvas
-        c.delete('all')
         w = c.winfo_width()
         h = c.winfo_height()
-        if w <= 0:
+        if w <= 0 or not self.nav_items:
             return
 
         # positions for icons (approx)
         xs = [w * 0.15, w * 0.35, w * 0.5, w * 0.85]
         y = h / 2
+        for key, x in zip(('home', 'explore', 'write', 'profile'), xs):
+            c.coords(self.nav_items[key], x, y)
 
-        # Home icon (left)
-        if 'home' in self.icon_images:
-            img = self.icon_images['home']
-            c.create_image(xs[0], y, image=img, tags=('home',), anchor='center')
-        else:
-            c.create_text(xs[0], y, text='🏠', font=('Helvetica', 18), tags=('home',), anchor='center')
-        c.tag_bind('home', '<Button-1>', lambda e: self.show_home())
-
-        # Explore icon
-        if 'explore' in self.icon_images:
-            img = self.icon_images['explore']
-            c.create_image(xs[1], y, image=img, tags=('explore',), anchor='center')
-        else:
-            c.create_text(xs[1], y, text='🌍', font=('Helvetica', 18), tags=('explore',), anchor='center')
-        c.tag_bind('explore', '<Button-1>', lambda e: messagebox.showinfo('Explore', 'Explore clicked'))
-
-        # Center rounded pill (with shadow and hover effect)
         cx = xs[2]
         pill_w = 120
         pill_h = 52
@@ -163,48 +442,33 @@ class LingrowApp:
         right = cx + pill_w / 2
         top = y - pill_h / 2
         bottom = y + pill_h / 2
-        # shadow (slightly offset)
-            # (shadow removed to avoid possible rendering/blocking issues)
-
-        # pick pill color depending on hover state
+        left_oval, right_oval, middle = self.nav_items['pill']
+        c.coords(left_oval, left, top, left + pill_h, bottom)
+        c.coords(right_oval, right - pill_h, top, right, bottom)
+        c.coords(middle, left + pill_h/2, top, right - pill_h/2, bottom)
+        self._record_nav_time('layout', start)
+
+    def update_pill(self):
+        """Recolor the pill for the current hover state."""
+        start = time.perf_counter()
         pill_color = self._adjust_color(self.accent, -0.06) if self.pill_hover else self.accent
-        # create the pill shapes and tag them so we can bind hover/click without extra overlays
-        c.create_oval(left, top, left + pill_h, bottom, fill=pill_color, outline='', tags=('pill',))
-        c.create_oval(right - pill_h, top, right, bottom, fill=pill_color, outline='', tags=('pill',))
-        c.create_rectangle(left + pill_h/2, top, right - pill_h/2, bottom, fill=pill_color, outline='', tags=('pill',))
-        # center write icon inside pill
-        if 'write' in self.icon_images:
-            img = self.icon_images['write']
-            c.create_image(cx, y, image=img, tags=('write',), anchor='center')
-        else:
-            c.create_text(cx, y, text='✍️', font=('Helvetica', 18), fill='white', tags=('write',), anchor='center')
-        c.tag_bind('write', '<Button-1>', lambda e: self.open_write_popup())
-        # bind the pill shapes for hover and clicks (no transparent overlay needed)
-        c.tag_bind('pill', '<Button-1>', lambda e: self.on_pill_click(e))
-        c.tag_bind('pill', '<Enter>', lambda e: self.on_pill_enter(e))
-        c.tag_bind('pill', '<Leave>', lambda e: self.on_pill_leave(e))
-
-        # Profile icon (right)
-        if 'profile' in self.icon_images:
-            img = self.icon_images['profile']
-            c.create_image(xs[3], y, image=img, tags=('profile',), anchor='center')
-        else:
-            c.create_text(xs[3], y, text='👤', font=('Helvetica', 18), tags=('profile',), anchor='center')
-        c.tag_bind('profile', '<Button-1>', lambda e: self.show_profile())
+        for item in self.nav_items.get('pill', []):
+            self.nav_canvas.itemconfig(item, fill=pill_color)
+        self._record_nav_time('hover', start)
 
     def on_pill_enter(self, event=None):
         self.pill_hover = True
-        self.draw_nav()
+        self.update_pill()
 
     def on_pill_leave(self, event=None):
         self.pill_hover = False
-        self.draw_nav()
+        self.update_pill()
 
     def on_pill_click(self, event=None):
         # quick visual feedback then open write popup
         self.pill_hover = True
-        self.draw_nav()
-        self.root.after(120, lambda: (setattr(self, 'pill_hover', False), self.draw_nav(), self.open_write_popup()))
+        self.update_pill()
+        self.root.after(120, lambda: (setattr(self, 'pill_hover', False), self.update_pill(), self.open_write_popup()))
 
     def _adjust_color(self, hex_color, factor: float) -> str:
         """Lighten or darken a hex color by factor (-1.0..1.0)."""
@@ -224,45 +488,38 @@ class LingrowApp:
         except Exception:
             return hex_color
 
+    @timed('load_nav_icons_seconds')
     def load_nav_icons(self, size=(36, 36)):
         """Try to load PNG or SVG icons from ICON_PATHS into PhotoImage objects.
         If cairosvg is installed it will convert SVG to PNG on the fly.
+        Decoded images come from the shared image cache.
         """
+        # Try to set application icon from generated assets (if available)
+        try:
+            _, ImageTk = load_pil()
+            if os.path.exists(LOGO_PATH):
+                img = logo_thumbnail((64, 64))
+                self.app_icon = ImageTk.PhotoImage(img)
+                try:
+                    self.root.iconphoto(False, self.app_icon)
+                except Exception:
+                    # some platforms may not support iconphoto
+                    pass
+        except Exception:
+            # Pillow not available or load failed; ignore
+            pass
+
+        # one decode for every icon in the sprite atlas, if there is one
+        self.load_nav_atlas(size)
+
         for key, path in ICON_PATHS.items():
-            # Try to set application icon from generated assets (if available)
-            try:
-                from PIL import Image, ImageTk
-                icon_path = os.path.join('assets', 'lingrow_logo.png')
-                if os.path.exists(icon_path):
-                    img = Image.open(icon_path)
-                    img.thumbnail((64, 64))
-                    self.app_icon = ImageTk.PhotoImage(img)
-                    try:
-                        root.iconphoto(False, self.app_icon)
-                    except Exception:
-                        # some platforms may not support iconphoto
-                        pass
-            except Exception:
-                # Pillow not available or load failed; ignore
-                pass
-            if not os.path.exists(path):
+            if key in self.icon_images or not os.path.exists(path):
                 continue
 
             # Try to load with Pillow (preferred) and support SVG via cairosvg if available
             try:
-                from PIL import Image, ImageTk
-                if path.lower().endswith('.svg'):
-                    try:
-                        import cairosvg
-                        png_bytes = cairosvg.svg2png(url=path)
-                        img = Image.open(io.BytesIO(png_bytes))
-                    except Exception:
-                        # Can't convert SVG here, skip to fallback
-                        raise
-                else:
-                    img = Image.open(path)
-
-                img.thumbnail(size, Image.LANCZOS)
+                Image, ImageTk = load_pil()
+                img = get_image_cache().thumbnail(path, size, Image.LANCZOS)
                 self.icon_images[key] = ImageTk.PhotoImage(img)
                 continue
             except Exception:
@@ -274,24 +531,52 @@ class LingrowApp:
                     # give up on this icon
                     continue
 
-    def build_home(self):
-        f = self.home_frame
-        # Top area: logo and subtitle
-        top = tk.Frame(f, bg=self.bg)
-        top.pack(fill='x', pady=12)
-        logo_frame = tk.Frame(top, bg=self.bg)
-        logo_frame.pack(padx=16, anchor='w')
-        # small canvas for logo image if present
-        self.logo_canvas = tk.Canvas(logo_frame, width=48, height=48, bg=self.bg, highlightthickness=0)
-        self.logo_canvas.pack(side='left')
-        # Try to load the app logo generated in assets/lingrow_logo.png
+    def load_nav_atlas(self, size=(36, 36)):
+        """Load nav icons by cutting them out of the sprite atlas.
+
+        The atlas is decoded once (and kept in the image cache); each icon is
+        a crop of it. Icons missing from the atlas are left for the caller
+        to load from ICON_PATHS.
+        """
+        try:
+            with open(ICON_ATLAS_MANIFEST, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            sprites = manifest['sprites']
+            atlas_path = os.path.join(os.path.dirname(ICON_ATLAS_MANIFEST), manifest['image'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if not os.path.exists(atlas_path):
+            return
+        wanted = [(key, sprites[key]) for key in ICON_PATHS if key in sprites]
+        try:
+            Image, ImageTk = load_pil()
+            atlas = get_image_cache().image(atlas_path)
+            for key, (x, y, w, h) in wanted:
+                icon = atlas.crop((x, y, x + w, y + h))
+                icon.thumbnail(size, Image.LANCZOS)
+                self.icon_images[key] = ImageTk.PhotoImage(icon)
+        except Exception:
+            # without Pillow, Tk can read the PNG itself and copy each region out,
+            # shrunk by a whole-number factor
+            try:
+                atlas = tk.PhotoImage(file=atlas_path)
+                for key, (x, y, w, h) in wanted:
+                    factor = max(1, min(w // size[0], h // size[1]))
+                    icon = tk.PhotoImage()
+                    icon.tk.call(icon, 'copy', atlas, '-from', x, y, x + w, y + h, '-subsample', factor)
+                    self.icon_images[key] = icon
+            except Exception:
+                # leave the icons to the one-file-per-icon fallback
+                pass
+
+    def load_logo(self):
+        """Show the app logo from assets/lingrow_logo.png in the logo canvas."""
         try:
-            icon_path = os.path.join('assets', 'lingrow_logo.png')
+            icon_path = LOGO_PATH
             if os.path.exists(icon_path):
                 try:
-                    from PIL import Image, ImageTk
-                    img = Image.open(icon_path)
-                    img.thumbnail((48, 48))
+                    _, ImageTk = load_pil()
+                    img = logo_thumbnail((48, 48))
                     self.app_logo = ImageTk.PhotoImage(img)
                     self.logo_canvas.create_image(24, 24, image=self.app_logo)
                 except Exception:
@@ -302,6 +587,21 @@ class LingrowApp:
         except Exception:
             # no logo available or failed to load; ignore
             pass
+
+    @timed('build_home_seconds')
+    def build_home(self):
+        f = self.home_frame
+        # Top area: logo and subtitle
+        top = tk.Frame(f, bg=self.bg)
+        top.pack(fill='x', pady=12)
+        logo_frame = tk.Frame(top, bg=self.bg)
+        logo_frame.pack(padx=16, anchor='w')
+        # small canvas for logo image if present
+        self.logo_canvas = tk.Canvas(logo_frame, width=48, height=48, bg=self.bg, highlightthickness=0)
+        self.logo_canvas.pack(side='left')
+        # the logo image is loaded right after the first frame (see load_logo)
+        if self.eager:
+            self.load_logo()
         tk.Label(logo_frame, text='Lingrow', font=('Helvetica', 20, 'bold'), fg=self.accent, bg=self.bg).pack(side='left', padx=8)
         tk.Label(f, text='Your voice, in any language.', bg=self.bg, fg=self.accent, font=('Helvetica', 12)).pack(anchor='w', padx=18)
 
@@ -318,11 +618,37 @@ class LingrowApp:
         btn_style = {'bg': self.card, 'relief': 'groove', 'bd': 1, 'padx': 8, 'pady': 10}
         tk.Button(btns, text='✎ Write something', command=self.open_write_popup, **btn_style).pack(fill='x', pady=6)
         tk.Button(btns, text='🌍 Explore cultural expressions', command=lambda: messagebox.showinfo('Explore', 'Explore cultural expressions'), **btn_style).pack(fill='x', pady=6)
-        tk.Button(btns, text='💡 Recent improvements', command=lambda: messagebox.showinfo('Recent', 'Recent improvements'), **btn_style).pack(fill='x', pady=6)
+        tk.Button(btns, text='💡 Recent improvements', command=self.show_history, **btn_style).pack(fill='x', pady=6)
 
         self.home_frame.pack(fill='both', expand=True)
 
+    def show_history(self):
+        """Open the saved-texts browser (newest first)."""
+        HistoryBrowser(self.root, bg=self.bg, card=self.card, accent=self.accent)
+
+    def load_deferred_images(self):
+        """Load the logo now, and the nav icons at the next idle moment."""
+        self.load_logo()
+
+        def load_icons():
+            self.load_nav_icons()
+            self.refresh_nav_icons()
+        self.root.after_idle(load_icons)
+
+    def refresh_nav_icons(self):
+        """Swap emoji placeholders in the nav for icons that are now loaded."""
+        c = self.nav_canvas
+        for key, img in self.icon_images.items():
+            item = self.nav_items.get(key)
+            if item is None or c.type(item) == 'image':
+                continue
+            x, y = c.coords(item)
+            c.delete(item)
+            # same tag, so the click binding made in build_nav still applies
+            self.nav_items[key] = c.create_image(x, y, image=img, tags=(key,), anchor='center')
+
     def build_profile(self):
+        self.profile_built = True
         f = self.profile_frame
         f.config(bg=self.bg)
         header = tk.Frame(f, bg=self.bg)
@@ -353,6 +679,8 @@ class LingrowApp:
         self.home_frame.pack(fill='both', expand=True)
 
     def show_profile(self):
+        if not self.profile_built:
+            self.build_profile()
         self.home_frame.pack_forget()
         self.profile_frame.pack(fill='both', expand=True)
 
@@ -362,20 +690,36 @@ class LingrowApp:
             self.load_image(path)
 
     def load_image(self, path):
-        # load and show in both logo canvas (small) and main canvas
+        """Show `path` in the logo and main canvases.
+
+        Decoding runs on the worker thread (at reduced size, see
+        ImageCache.thumbnails); a placeholder is shown until it is done,
+        and only the PhotoImages are made here on the main thread.
+        """
+        self.canvas.delete('all')
+        self.canvas.create_rectangle(80, 20, 280, 180, fill='#eeeeee', outline='')
+        self.canvas.create_text(180, 100, text='Loading…', fill='gray')
+
+        def prepare():
+            # decode once and make both sizes (cached for next time)
+            return (lambda: get_image_cache().thumbnails(path, [(48, 48), (360, 200)]),
+                    lambda result, seconds: self.show_loaded_image(path, result))
+        if self.image_runner is None:
+            self.image_runner = BackgroundRunner(self.root)
+        self.image_runner.request(prepare)
+
+    def show_loaded_image(self, path, result):
         try:
-            from PIL import Image, ImageTk
-            img = Image.open(path)
+            if isinstance(result, str):  # the decode failed (or Pillow is missing)
+                raise RuntimeError(result)
+            _, ImageTk = load_pil()
+            logo, main_img = result
             # small logo
-            logo = img.copy()
-            logo.thumbnail((48, 48))
             self.logo_tk = ImageTk.PhotoImage(logo)
             self.logo_canvas.delete('all')
             self.logo_canvas.create_image(24, 24, image=self.logo_tk)
 
             # main canvas image
-            main_img = img.copy()
-            main_img.thumbnail((360, 200))
             self.tk_image = ImageTk.PhotoImage(main_img)
             self.canvas.delete('all')
             self.canvas.create_image(180, 100, image=self.tk_image)
@@ -391,6 +735,7 @@ class LingrowApp:
                 self.tk_image = img
                 self.image_path = path
             except Exception as e:
+                self.canvas.delete('all')
                 messagebox.showerror('Error', f'Could not open image: {e}')
 
     def open_write_popup(self):
@@ -403,27 +748,211 @@ class LingrowApp:
 
         out = tk.Text(top, height=8, state='disabled')
         out.pack(fill='both', expand=True, padx=8, pady=6)
-
-        def do_and_show(func, label):
-            t = text.get('1.0', 'end').strip()
-            if not t:
-                return
-            s = func(t)
+        # what the suggestion changed: removed words in the input, new ones in the output
+        text.tag_configure('removed', background='#ffd6d6')
+        out.tag_configure('added', background='#d4f0dc')
+
+        status = tk.Label(top, text='', anchor='w', fg='gray')
+        status.pack(fill='x', padx=8)
+
+        # suggestions run in the background; closing the popup drops them
+        runner = BackgroundRunner(self.root)
+        # the style used by the live preview (the last button pressed), the
+        # input text (read again only after an edit) with the whitespace
+        # stripped from its start, a count of edits, and the output shown,
+        # kept as TextSegments so long outputs are never joined into one string
+        current = {'style': 'professional', 'label': 'Professional', 'input': None,
+                   'lead': '', 'edits': 0, 'segments': TextSegments(), 'render_job': None}
+        live = tk.BooleanVar(value=False)
+
+        def on_destroy(event):
+            if event.widget is top:
+                runner.cancel()
+                if current['render_job'] is not None:
+                    top.after_cancel(current['render_job'])
+
+        top.bind('<Destroy>', on_destroy)
+
+        def get_input():
+            if current['input'] is None:
+                raw = text.get('1.0', 'end')
+                stripped = raw.lstrip()
+                current['lead'] = raw[:len(raw) - len(stripped)]
+                current['input'] = stripped.rstrip()
+            return current['input']
+
+        def show(label, original, lead, edits, result, seconds):
+            if isinstance(result, str):  # an error message
+                result = (TextSegments([result]), [], [])
+            body, removed, added = result
+            segments = TextSegments([f'--- {label} ---\n'])
+            segments.extend(body)
+            current['segments'] = segments
+            if current['render_job'] is not None:
+                top.after_cancel(current['render_job'])
+                current['render_job'] = None
             out.config(state='normal')
             out.delete('1.0', 'end')
-            out.insert('end', f'--- {label} ---\n')
-            out.insert('end', s)
             out.config(state='disabled')
 
+            def finish():
+                # one tag_add call for all ranges instead of one per word
+                if added:
+                    out.tag_add('added', *text_indices(segments, added, len(segments[0])))
+                text.tag_remove('removed', '1.0', 'end')
+                # only mark the input if it was not edited in the meantime
+                if removed and edits == current['edits']:
+                    text.tag_add('removed', *text_indices([lead, original], removed, len(lead)))
+                status.config(text=f'{label} ready in {seconds * 1000:.0f} ms')
+
+            def render(i):
+                # large outputs go in one chunk per after() callback, so the
+                # window can redraw and react to input in between
+                current['render_job'] = None
+                out.config(state='normal')
+                out.insert('end', segments[i])
+                out.config(state='disabled')
+                if i + 1 < len(segments):
+                    status.config(text=f'{label}: {i + 1} of {len(segments)} parts shown')
+                    current['render_job'] = top.after(1, render, i + 1)
+                else:
+                    finish()
+
+            if sum(map(len, segments)) > LARGE_OUTPUT_CHARS:
+                render(0)
+            else:
+                out.config(state='normal')
+                for segment in segments:
+                    out.insert('end', segment)
+                out.config(state='disabled')
+                finish()
+
+        def request(delay_ms):
+            def prepare():
+                t = get_input()
+                if not t:
+                    return None
+                style, label = current['style'], current['label']
+                lead, edits = current['lead'], current['edits']
+
+                def work():
+                    if style == 'all':
+                        # every style side by side (one shared pass, no highlighting)
+                        results = suggest_all(t)
+                        return split_segments('\n\n'.join(f'{name.capitalize()}:\n{value}'
+                                                           for name, value in results.items())), [], []
+                    # reuses earlier results; otherwise only changed sentences are rewritten
+                    s = cached_suggestion(style, t)
+                    return (split_segments(s),) + diff_ranges(t, s)
+                return work, (lambda result, seconds: show(label, t, lead, edits, result, seconds))
+            runner.request(prepare, delay_ms)
+
+        def do_and_show(style, label):
+            current['style'] = style
+            current['label'] = label
+            request(0)
+
+        def on_text_changed(event=None):
+            # <<Modified>> fires again when we reset the flag; ignore that one
+            if not text.edit_modified():
+                return
+            text.edit_modified(False)
+            current['input'] = None
+            current['edits'] += 1
+            text.tag_remove('removed', '1.0', 'end')
+            if live.get():
+                request(LIVE_PREVIEW_DEBOUNCE_MS)
+
+        text.bind('<<Modified>>', on_text_changed)
+
+        def save():
+            # the output as shown, without trailing whitespace; the journal
+            # writes the segments one by one
+            preview = TextSegments(current['segments'])
+            while preview and not preview[-1].strip():
+                preview.pop()
+            if preview:
+                preview[-1] = preview[-1].rstrip()
+            title = os.path.basename(self.image_path) if self.image_path else 'untitled'
+            save_entry(title, get_input(), {'preview': preview})
+
         ctl = tk.Frame(top)
         ctl.pack(fill='x', padx=8, pady=6)
-        tk.Button(ctl, text='Professional', command=lambda: do_and_show(professional_suggestion, 'Professional')).pack(side='left', padx=6)
-        tk.Button(ctl, text='Neutral', command=lambda: do_and_show(neutral_suggestion, 'Neutral')).pack(side='left', padx=6)
-        tk.Button(ctl, text='Cultural', command=lambda: do_and_show(cultural_suggestion, 'Cultural')).pack(side='left', padx=6)
-        tk.Button(ctl, text='Save', command=lambda: save_entry(os.path.basename(self.image_path) if self.image_path else 'untitled', text.get('1.0', 'end').strip(), {'preview': out.get('1.0', 'end').strip()})).pack(side='right', padx=6)
+        tk.Button(ctl, text='Professional', command=lambda: do_and_show('professional', 'Professional')).pack(side='left', padx=6)
+        tk.Button(ctl, text='Neutral', command=lambda: do_and_show('neutral', 'Neutral')).pack(side='left', padx=6)
+        tk.Button(ctl, text='Cultural', command=lambda: do_and_show('cultural', 'Cultural')).pack(side='left', padx=6)
+        tk.Button(ctl, text='Compare all', command=lambda: do_and_show('all', 'All styles')).pack(side='left', padx=6)
+        tk.Checkbutton(ctl, text='Live', variable=live, command=lambda: live.get() and request(0)).pack(side='left', padx=6)
+        tk.Button(ctl, text='Save', command=save).pack(side='right', padx=6)
+
+
+def measure_first_frame(root):
+    """Print (and record) the time from startup until the window is first drawn."""
+    done = []
+
+    def on_map(event):
+        if event.widget is not root or done:
+            return
+        done.append(True)
+        # let Tk finish drawing before taking the time
+        root.update_idletasks()
+        seconds = time.perf_counter() - STARTUP_TIME
+        METRICS.observe('time_to_first_frame_seconds', seconds)
+        print(f'time to first frame: {seconds * 1000:.1f} ms')
+
+    root.bind('<Map>', on_map, add='+')
+
+
+def parse_args(argv=None):
+    import argparse
+
+    def positive_int(value):
+        # a clean usage error instead of a traceback from the pool later
+        try:
+            number = int(value)
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise argparse.ArgumentTypeError(f'must be a positive integer, not {value!r}')
+        return number
+
+    parser = argparse.ArgumentParser(description='Lingrow writing helper')
+    parser.add_argument('--batch', metavar='IN.jsonl',
+                        help='process a JSONL file without opening the window')
+    parser.add_argument('--output', '-o', metavar='OUT.jsonl',
+                        help='where to write batch results (default: stdout)')
+    parser.add_argument('--workers', type=positive_int, default=None,
+                        help='number of worker processes for --batch (default: CPU count)')
+    parser.add_argument('--chunk-size', type=positive_int, default=BATCH_CHUNK_SIZE,
+                        help='records sent to a worker at a time')
+    parser.add_argument('--serve', metavar='HOST:PORT', nargs='?', const='127.0.0.1:8765',
+                        help='run the local suggestion service (default 127.0.0.1:8765)')
+    parser.add_argument('--startup-timing', action='store_true',
+                        help='print the time until the window is first drawn')
+    parser.add_argument('--eager-startup', action='store_true',
+                        help='build every screen and load every image before showing the window')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='record timings and write them to FILE at exit (.json, or .prom for Prometheus text)')
+    parser.add_argument('--profile', metavar='FUNCTION',
+                        help='profile every call of FUNCTION in this process with cProfile '
+                             '(e.g. cached_suggestion, or suggest_all with --batch --workers 1)')
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
-    root = tk.Tk()
-    app = LingrowApp(root)
-    root.mainloop()
+    args = parse_args()
+    if args.metrics:
+        enable_metrics(args.metrics)
+    profile = args.profile or os.environ.get('LINGROW_PROFILE')
+    if profile:
+        enable_profiling(profile)
+    if args.serve:
+        run_service(args.serve)
+    elif args.batch:
+        run_batch(args.batch, args.output, workers=args.workers, chunk_size=args.chunk_size)
+    else:
+        root = tk.Tk()
+        if args.startup_timing or os.environ.get('LINGROW_STARTUP_TIMING'):
+            measure_first_frame(root)
+        app = LingrowApp(root, eager=args.eager_startup)
+        root.mainloop()
@@ -0,0 +1,284 @@
+"""Opt-in timings and counters (--metrics) and profiling (--profile)."""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+
+# --- Metrics (opt-in) -------------------------------------------------------
+# Set LINGROW_METRICS=report.json (or report.prom for Prometheus text), or
+# pass --metrics, to record how long the hot paths take. The report is
+# written when the program exits. When metrics are off, timers return a
+# shared do-nothing object, so the cost is one attribute check per call.
+
+HISTOGRAM_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'key', 'start')
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Counters and timing histograms, keyed by name and labels."""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.counters = {}  # (name, labels) -> number
+        self.histograms = {}  # (name, labels) -> [count, sum, min, max, bucket counts]
+        self.gauges = {}  # (name, labels) -> number, set when the report is made
+        self.gauge_sources = []  # functions that set gauges just before a report
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def timer(self, name, **labels):
+        """Context manager that records how long its block took."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, self._key(name, labels))
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self._observe(self._key(name, labels), seconds)
+
+    def _observe(self, key, seconds):
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0, 0.0, seconds, seconds, [0] * len(HISTOGRAM_BUCKETS)]
+            h[0] += 1
+            h[1] += seconds
+            h[2] = min(h[2], seconds)
+            h[3] = max(h[3], seconds)
+            buckets = h[4]
+            for i, limit in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= limit:
+                    buckets[i] += 1
+                    break
+
+    def count(self, name, n=1, **labels):
+        if self.enabled:
+            key = self._key(name, labels)
+            with self.lock:
+                self.counters[key] = self.counters.get(key, 0) + n
+
+    def add_gauge_source(self, collect):
+        """Call collect(metrics) before each report, so a module can copy
+        the counters it keeps itself into the report."""
+        self.gauge_sources.append(collect)
+
+    def gauge(self, name, value, **labels):
+        if self.enabled:
+            with self.lock:
+                self.gauges[self._key(name, labels)] = value
+
+    def snapshot(self, reset=False):
+        """Plain data copy of everything recorded (used to merge from workers)."""
+        with self.lock:
+            data = {
+                'counters': list(self.counters.items()),
+                'histograms': [(k, [h[0], h[1], h[2], h[3], list(h[4])]) for k, h in self.histograms.items()],
+            }
+            if reset:
+                self.counters.clear()
+                self.histograms.clear()
+        return data
+
+    def merge(self, data):
+        """Add a snapshot() from another process into this one."""
+        with self.lock:
+            for key, n in data['counters']:
+                self.counters[key] = self.counters.get(key, 0) + n
+            for key, other in data['histograms']:
+                h = self.histograms.get(key)
+                if h is None:
+                    self.histograms[key] = other
+                    continue
+                h[0] += other[0]
+                h[1] += other[1]
+                h[2] = min(h[2], other[2])
+                h[3] = max(h[3], other[3])
+                h[4] = [a + b for a, b in zip(h[4], other[4])]
+
+    def to_json(self):
+        def entry(key):
+            name, labels = key
+            return {'name': name, 'labels': dict(labels)}
+
+        with self.lock:
+            histograms = []
+            for key, (count, total, low, high, buckets) in sorted(self.histograms.items()):
+                item = entry(key)
+                item.update(count=count, sum=total, min=low, max=high,
+                            mean=total / count if count else 0.0,
+                            buckets={str(limit): n for limit, n in zip(HISTOGRAM_BUCKETS, buckets)})
+                histograms.append(item)
+            counters = [dict(entry(k), value=v) for k, v in sorted(self.counters.items())]
+            gauges = [dict(entry(k), value=v) for k, v in sorted(self.gauges.items())]
+        return {'created': time.time(), 'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def to_prometheus(self):
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f'lingrow_{name}_total{fmt_labels(labels)} {value}')
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f'lingrow_{name}{fmt_labels(labels)} {value}')
+            for (name, labels), (count, total, _, _, buckets) in sorted(self.histograms.items()):
+                running = 0
+                for limit, n in zip(HISTOGRAM_BUCKETS, buckets):
+                    running += n
+                    lines.append(f'lingrow_{name}_bucket{fmt_labels(labels, [("le", limit)])} {running}')
+                lines.append(f'lingrow_{name}_bucket{fmt_labels(labels, [("le", "+Inf")])} {count}')
+                lines.append(f'lingrow_{name}_sum{fmt_labels(labels)} {total}')
+                lines.append(f'lingrow_{name}_count{fmt_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        for collect in self.gauge_sources:
+            collect(self)
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), f, indent=2)
+
+
+METRICS = Metrics()
+
+
+def timed(name, **labels):
+    """Decorator: record each call's duration under `name` when metrics are on."""
+    def decorate(func):
+        key = Metrics._key(name, labels)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                METRICS._observe(key, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def enable_metrics(path):
+    """Turn metrics on and write the report to `path` at exit.
+
+    The path is also put in the environment so worker processes started
+    later (batch mode) record metrics too; they send them back with their
+    results, and only the main process writes the report.
+    """
+    import multiprocessing
+    METRICS.enabled = True
+    METRICS.path = path
+    os.environ['LINGROW_METRICS'] = path
+    if multiprocessing.parent_process() is None:
+        atexit.register(METRICS.write_report)
+
+
+_profiler = None
+
+
+def enable_profiling(name, path=None):
+    """Run every call of the function `name` under cProfile.
+
+    `name` is a module-level function ("cached_suggestion" for the window
+    and the service, "suggest_all" for batch mode) or a method
+    ("Rewriter.rewrite"). Stats go to `path` (default lingrow_<name>.prof)
+    at exit; open them with `python -m pstats`.
+    """
+    import cProfile
+    import suggestions
+    global _profiler
+    modules = _app_modules()
+    owner_name, _, attr = name.rpartition('.')
+    found = [getattr(m, owner_name or attr) for m in modules if hasattr(m, owner_name or attr)]
+    if not found:
+        raise KeyError(name)
+    owner = found[0] if owner_name else None
+    func = getattr(owner, attr) if owner is not None else found[0]
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+    profiler = _profiler
+
+    @functools.wraps(func)
+    def profiled(*args, **kwargs):
+        return profiler.runcall(func, *args, **kwargs)
+
+    if owner is not None:
+        setattr(owner, attr, profiled)
+    else:
+        # every module that imported the function holds its own reference
+        for module in modules:
+            if getattr(module, attr, None) is func:
+                setattr(module, attr, profiled)
+        # tables that hold the function directly need the wrapped one too
+        for style, f in suggestions.SUGGESTION_FUNCTIONS.items():
+            if f is func:
+                suggestions.SUGGESTION_FUNCTIONS[style] = profiled
+        for style, steps in suggestions.INCREMENTAL_STYLES.items():
+            suggestions.INCREMENTAL_STYLES[style] = tuple(profiled if f is func else f for f in steps)
+    atexit.register(_dump_profile, profiler, path or f'lingrow_{name}.prof', name)
+
+
+def _app_modules():
+    """The loaded modules of this app (the .py files next to this one)."""
+    import sys
+    folder = os.path.dirname(os.path.abspath(__file__))
+    return [module for module in list(sys.modules.values())
+            if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '/')) == folder]
+
+
+def _dump_profile(profiler, path, name):
+    import sys
+    profiler.create_stats()
+    if not profiler.stats:
+        # an empty file would only make pstats fail later
+        print(f'--profile: {name} was never called; nothing written to {path}', file=sys.stderr)
+        return
+    profiler.dump_stats(path)
+
+
+if os.environ.get('LINGROW_METRICS'):
+    enable_metrics(os.environ['LINGROW_METRICS'])
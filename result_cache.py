@@ -0,0 +1,248 @@
+"""Finished suggestions remembered in memory and in a small SQLite file."""
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import METRICS
+from suggestions import (CULTURAL_NOTE, CULTURAL_REWRITER, PROFESSIONAL_REWRITER,
+                         get_incremental_suggester)
+
+# Suggestion results remembered between runs (SQLite, next to the saved texts)
+RESULT_CACHE_FILE = "suggestion_cache.sqlite3"
+RESULT_CACHE_MEMORY_BYTES = 16 * 1024 * 1024
+RESULT_CACHE_DISK_BYTES = 64 * 1024 * 1024
+RESULT_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds
+RESULT_CACHE_EVICT_EVERY = 200  # new results between disk clean-ups
+RESULT_CACHE_FLUSH_EVERY = 64  # pending disk writes before one commit
+RESULT_CACHE_FLUSH_INTERVAL = 5.0  # seconds; commit pending writes at least this often
+RESULT_CACHE_TOUCH_AFTER = 3600  # seconds; only refresh last_used when it is older
+# Bump when the suggestion code changes in a way the rules hash can't see
+SUGGESTION_CODE_VERSION = 2
+
+
+# --- Saved suggestion results ---------------------------------------------
+# The same text often gets submitted again, so finished suggestions are
+# remembered: in memory (LRU) and in a small SQLite file next to the saved
+# texts, so they survive restarts. Keys include the rules version, so
+# changing a rule dictionary makes the old results unused.
+
+def rules_version():
+    """Short hash of everything that changes the suggestion results."""
+    data = json.dumps([SUGGESTION_CODE_VERSION, PROFESSIONAL_REWRITER.version,
+                       CULTURAL_REWRITER.version, CULTURAL_NOTE])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+class SuggestionCache:
+    """Memoizes suggestion results by (rules version, style, text digest).
+
+    Memory: LRU limited to `memory_bytes`. Disk: entries older than
+    `max_age` seconds are dropped, and the oldest-used entries go first
+    when the file holds more than `disk_bytes` of results.
+
+    Disk writes (new results, and last_used updates, which are only needed
+    when the stored time is over an hour old) are queued and committed
+    together every RESULT_CACHE_FLUSH_EVERY writes or
+    RESULT_CACHE_FLUSH_INTERVAL seconds, and on close().
+    """
+
+    def __init__(self, path=RESULT_CACHE_FILE, memory_bytes=RESULT_CACHE_MEMORY_BYTES,
+                 disk_bytes=RESULT_CACHE_DISK_BYTES, max_age=RESULT_CACHE_MAX_AGE):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_age = max_age
+        self.version = rules_version()
+        self.memory = OrderedDict()  # key -> result
+        self.memory_used = 0
+        self.lock = threading.Lock()
+        self.puts = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'commits': 0}
+        self.pending_rows = {}  # key -> row to insert
+        self.pending_touches = {}  # key -> new last_used
+        self.last_flush = time.monotonic()
+        self.db = None
+        if path:
+            self._open_db()
+
+    def _open_db(self):
+        import sqlite3
+        try:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('CREATE TABLE IF NOT EXISTS results ('
+                       'key BLOB PRIMARY KEY, version TEXT, value TEXT, '
+                       'size INTEGER, last_used REAL)')
+            # results made with other rules can never be used again
+            db.execute('DELETE FROM results WHERE version != ?', (self.version,))
+            db.commit()
+        except sqlite3.Error:
+            # the disk store is only a speed-up; keep working from memory
+            self.db = None
+            return
+        self.db = db
+        self.evict()
+
+    def make_key(self, style, text):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f'{self.version}\0{style}\0'.encode('utf-8'))
+        h.update(text.encode('utf-8'))
+        return h.digest()
+
+    def _remember(self, key, value):
+        size = len(value) * 2 + 64
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= len(old) * 2 + 64
+        self.memory[key] = value
+        self.memory_used += size
+        while self.memory_used > self.memory_bytes and self.memory:
+            _, dropped = self.memory.popitem(last=False)
+            self.memory_used -= len(dropped) * 2 + 64
+
+    def get(self, style, text, compute):
+        """Return the cached result, or compute(style, text) and store it."""
+        key = self.make_key(style, text)
+        with self.lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return value
+            pending = self.pending_rows.get(key)
+            if pending is not None:
+                self.stats['memory_hits'] += 1
+                self._remember(key, pending[2])
+                return pending[2]
+            if self.db is not None:
+                row = self.db.execute('SELECT value, last_used FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    now = time.time()
+                    if now - row[1] > RESULT_CACHE_TOUCH_AFTER:
+                        self.pending_touches[key] = now
+                        self._maybe_flush_locked()
+                    self.stats['disk_hits'] += 1
+                    self._remember(key, row[0])
+                    return row[0]
+            self.stats['misses'] += 1
+        value = compute(style, text)
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.pending_rows[key] = (key, self.version, value, len(value.encode('utf-8')), time.time())
+                self.puts += 1
+                self._maybe_flush_locked()
+        return value
+
+    def _maybe_flush_locked(self):
+        if (len(self.pending_rows) + len(self.pending_touches) >= RESULT_CACHE_FLUSH_EVERY
+                or time.monotonic() - self.last_flush >= RESULT_CACHE_FLUSH_INTERVAL):
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Write queued results and last_used updates in one transaction."""
+        self.last_flush = time.monotonic()
+        if self.db is None or not (self.pending_rows or self.pending_touches):
+            return
+        self.db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                            list(self.pending_rows.values()))
+        self.db.executemany('UPDATE results SET last_used = ? WHERE key = ?',
+                            [(used, key) for key, used in self.pending_touches.items()])
+        self.db.commit()
+        self.stats['commits'] += 1
+        puts_before = self.puts - len(self.pending_rows)
+        self.pending_rows.clear()
+        self.pending_touches.clear()
+        # clean up the file every RESULT_CACHE_EVICT_EVERY new results
+        if self.puts // RESULT_CACHE_EVICT_EVERY > puts_before // RESULT_CACHE_EVICT_EVERY:
+            self._evict_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _evict_locked(self):
+        db = self.db
+        db.execute('DELETE FROM results WHERE last_used < ?', (time.time() - self.max_age,))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total > self.disk_bytes:
+            # drop the least recently used results until we are under budget
+            rows = db.execute('SELECT key, size FROM results ORDER BY last_used').fetchall()
+            drop = []
+            for key, size in rows:
+                if total <= self.disk_bytes:
+                    break
+                drop.append((key,))
+                total -= size
+            db.executemany('DELETE FROM results WHERE key = ?', drop)
+        db.commit()
+
+    def evict(self):
+        with self.lock:
+            if self.db is not None:
+                self._evict_locked()
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self._flush_locked()
+                self.db.close()
+                self.db = None
+
+
+def _compute_suggestion(style, text):
+    # the window and the service compute results here (batch mode uses
+    # suggest_all), so this is where suggestion_seconds is recorded
+    with METRICS.timer('suggestion_seconds', style=style):
+        return get_incremental_suggester().suggest(style, text)
+
+
+_result_cache = None
+
+
+def get_result_cache():
+    """Return the shared SuggestionCache, creating it on first use."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = SuggestionCache()
+        atexit.register(_result_cache.close)
+    return _result_cache
+
+
+def cached_suggestion(style, text):
+    """Suggestion for `style` ('professional', 'neutral' or 'cultural'),
+    reusing an earlier result for the same text when there is one."""
+    with METRICS.timer('cached_suggestion_seconds', style=style):
+        return get_result_cache().get(style, text, _compute_suggestion)
+
+
+def result_cache_stats():
+    """Counters of the shared result cache, or None if it was never opened."""
+    return dict(_result_cache.stats) if _result_cache is not None else None
+
+
+def _collect_gauges(metrics):
+    for name, value in (result_cache_stats() or {}).items():
+        metrics.gauge('result_cache_' + name, value)
+
+
+METRICS.add_gauge_source(_collect_gauges)
+
+
+# Suggestions for the window and the service run on one shared worker
+# thread, so they never hold up typing or the server's event loop.
+
+_worker_pool = None
+
+
+def get_worker_pool():
+    """Return the shared worker thread pool, creating it on first use."""
+    global _worker_pool
+    if _worker_pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _worker_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lingrow-worker')
+    return _worker_pool
@@ -0,0 +1,389 @@
+"""Rule packs: replacement rules compiled to memory-mapped files, and the
+Rewriter that applies them to text.
+"""
+import hashlib
+import json
+import os
+import re
+import struct
+
+# Rule packs: rules/<language>/<register>.tsv, compiled to .rulepack files
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules')
+RULES_LANGUAGE = os.environ.get('LINGROW_LANGUAGE', 'en')
+RULEPACK_MEMO_SIZE = 4096  # recent rule lookups remembered per process
+# packs up to this size are matched with one regex (building it costs about
+# 35 ms per 1000 keys in every process); bigger ones are looked up in the mmap
+RULEPACK_REGEX_MAX_KEYS = 1000
+
+
+def trie_pattern(words):
+    """Build a regex that matches any of the words, sharing common prefixes.
+
+    A plain "a|b|c" alternation makes the regex engine try every key at every
+    position. Grouping the keys by prefix (like a trie) means each position
+    only follows the branch that matches the next character.
+    """
+    # Build the trie as nested dicts; '' marks the end of a word
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def to_regex(node):
+        ends_here = '' in node
+        branches = [re.escape(ch) + to_regex(child)
+                    for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if ends_here else body
+
+    return to_regex(trie)
+
+
+# --- Rule packs ---------------------------------------------------------------
+# Big rule dictionaries live in data files: rules/<language>/<register>.tsv,
+# one "from<TAB>to" rule per line ('#' starts a comment). Each file is
+# compiled once into a binary .rulepack next to it: a header, a table of
+# fixed-size entries sorted by key (where the key and value are, and
+# flags), and the strings. The compiled file is memory-mapped read-only, so
+# opening it takes milliseconds and every process that uses it (batch
+# workers, the service) shares the same pages instead of its own copy.
+# Packs small enough to match with one regex are still read into a dict
+# (see Rewriter); the mapping matters for the big ones.
+#
+# Keys in a rule pack are words, or words separated by single spaces; other
+# keys are skipped with a warning when the file is read.
+
+RULEPACK_MAGIC = b'LGRP'
+RULEPACK_VERSION = 2
+RULEPACK_PERIOD_VALUES = 1  # header flag: some replacement contains '.'
+# magic, version, flags, entry count, most words in a key, source size,
+# source mtime (ns), digest of the rules
+_RULEPACK_HEADER = struct.Struct('<4sHHIIQQ16s')
+# key offset, value offset, value length, key length, flags
+_RULEPACK_ENTRY = struct.Struct('<IIIHH')
+RULE_HAS_VALUE = 1  # entry flag: the key has a replacement
+RULE_IS_PREFIX = 2  # entry flag: the key starts a longer multi-word key
+
+
+_RULE_KEY_RE = re.compile(r'\w+(?: \w+)*')
+
+
+def read_rule_source(path):
+    """Read a .tsv rule file into a {lowercase key: replacement} dict."""
+    import sys
+    rules = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            key, sep, value = line.partition('\t')
+            key = ' '.join(key.split()).lower()
+            if not (sep and key):
+                continue
+            if not _RULE_KEY_RE.fullmatch(key):
+                # "y'all" or "thx!" could never match a whole word
+                print(f'{path}:{line_no}: skipping rule {key!r}: keys must be words '
+                      f'separated by spaces', file=sys.stderr)
+                continue
+            rules[key] = value
+    return rules
+
+
+def compile_rule_pack(source_path, pack_path=None):
+    """Compile a .tsv rule file into a .rulepack file; returns its path."""
+    pack_path = pack_path or os.path.splitext(source_path)[0] + '.rulepack'
+    st = os.stat(source_path)
+    rules = read_rule_source(source_path)
+    # the first words of multi-word keys are stored too, marked as prefixes,
+    # so a lookup can stop as soon as no longer key can match
+    prefixes = set()
+    for key in rules:
+        words = key.split(' ')
+        for n in range(1, len(words)):
+            prefixes.add(' '.join(words[:n]))
+    keys = sorted(set(rules) | prefixes, key=lambda k: k.encode('utf-8'))
+    digest = hashlib.blake2b(digest_size=16)
+    entries = []
+    blob = bytearray()
+    for key in keys:
+        key_bytes = key.encode('utf-8')
+        value = rules.get(key)
+        flags = (RULE_HAS_VALUE if value is not None else 0) | (RULE_IS_PREFIX if key in prefixes else 0)
+        value_bytes = value.encode('utf-8') if value is not None else b''
+        if value is not None:
+            digest.update(key_bytes + b'\0' + value_bytes + b'\0')
+        entries.append(_RULEPACK_ENTRY.pack(len(blob), len(blob) + len(key_bytes), len(value_bytes),
+                                            len(key_bytes), flags))
+        blob += key_bytes + value_bytes
+    max_words = max((k.count(' ') + 1 for k in rules), default=0)
+    pack_flags = RULEPACK_PERIOD_VALUES if any('.' in v for v in rules.values()) else 0
+    header = _RULEPACK_HEADER.pack(RULEPACK_MAGIC, RULEPACK_VERSION, pack_flags, len(keys), max_words,
+                                   st.st_size, st.st_mtime_ns, digest.digest())
+    # a temporary name of our own, so processes compiling at the same time
+    # never write into each other's file
+    import tempfile
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(pack_path) or '.',
+                                    prefix=os.path.basename(os.path.splitext(pack_path)[0]) + '.',
+                                    suffix='.rulepack.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(b''.join(entries))
+            f.write(blob)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return pack_path
+
+
+class RulePack:
+    """Read-only view of a compiled .rulepack file (memory-mapped)."""
+
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < _RULEPACK_HEADER.size:
+            raise ValueError(f'{path}: not a rule pack')
+        (magic, version, self.flags, self.count, self.max_words,
+         self.source_size, self.source_mtime_ns, digest) = _RULEPACK_HEADER.unpack_from(self.data, 0)
+        if magic != RULEPACK_MAGIC or version != RULEPACK_VERSION:
+            raise ValueError(f'{path}: not a version {RULEPACK_VERSION} rule pack')
+        self.digest = digest.hex()
+        self.entries_start = _RULEPACK_HEADER.size
+        self.blob_start = self.entries_start + self.count * _RULEPACK_ENTRY.size
+        # small per-process memo of recent lookups (most texts reuse words)
+        self.memo = {}
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i):
+        return _RULEPACK_ENTRY.unpack_from(self.data, self.entries_start + i * _RULEPACK_ENTRY.size)
+
+    def lookup(self, key):
+        """(replacement or None, whether longer keys start with `key`).
+
+        `key` must be lowercase. Uses binary search over the entry table.
+        """
+        memo = self.memo
+        result = memo.get(key)
+        if result is not None:
+            return result
+        target = key.encode('utf-8')
+        data = self.data
+        blob_start = self.blob_start
+        lo, hi = 0, self.count
+        result = (None, False)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, val_off, val_len, key_len, flags = self._entry(mid)
+            start = blob_start + key_off
+            found = data[start:start + key_len]
+            if found < target:
+                lo = mid + 1
+            elif found > target:
+                hi = mid
+            else:
+                value = None
+                if flags & RULE_HAS_VALUE:
+                    start = blob_start + val_off
+                    value = data[start:start + val_len].decode('utf-8')
+                result = (value, bool(flags & RULE_IS_PREFIX))
+                break
+        if len(memo) >= RULEPACK_MEMO_SIZE:
+            memo.clear()
+        memo[key] = result
+        return result
+
+    def get(self, key):
+        """Replacement for a lowercase key, or None."""
+        return self.lookup(key)[0]
+
+    def items(self):
+        """(key, replacement) pairs in key order."""
+        for i in range(self.count):
+            key_off, val_off, val_len, key_len, flags = self._entry(i)
+            if not flags & RULE_HAS_VALUE:
+                continue
+            key_start = self.blob_start + key_off
+            val_start = self.blob_start + val_off
+            yield (self.data[key_start:key_start + key_len].decode('utf-8'),
+                   self.data[val_start:val_start + val_len].decode('utf-8'))
+
+
+def load_rule_pack(register, language=RULES_LANGUAGE, rules_dir=RULES_DIR):
+    """Open rules/<language>/<register>, compiling the .tsv if needed.
+
+    Returns a RulePack, or None when there is no rule file for it.
+    """
+    source = os.path.join(rules_dir, language, register + '.tsv')
+    if not os.path.exists(source):
+        return None
+    pack_path = os.path.join(rules_dir, language, register + '.rulepack')
+    try:
+        return _open_rule_pack(source, pack_path)
+    except OSError:
+        # cannot write next to the source; use one fixed file per source in
+        # the temp directory, so later starts reuse it
+        import tempfile
+        name = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:16]
+        cache_dir = os.path.join(tempfile.gettempdir(), 'lingrow-rulepacks')
+        os.makedirs(cache_dir, exist_ok=True)
+        return _open_rule_pack(source, os.path.join(cache_dir, f'{register}-{name}.rulepack'))
+
+
+def _open_rule_pack(source, pack_path):
+    """Open `pack_path`, first compiling `source` into it if it is missing
+    or older than the source."""
+    st = os.stat(source)
+    try:
+        pack = RulePack(pack_path)
+        if pack.source_size == st.st_size and pack.source_mtime_ns == st.st_mtime_ns:
+            return pack
+    except (OSError, ValueError):
+        pass
+    compile_rule_pack(source, pack_path)
+    return RulePack(pack_path)
+
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def match_case(found, new):
+    """Give `new` the case pattern of `found`: "OK" -> "OKAY", "Ok" -> "Okay"."""
+    if len(found) > 1 and found.isupper():
+        return new.upper()
+    if found[0].isupper():
+        return new[:1].upper() + new[1:]
+    return new
+
+
+class Rewriter:
+    """Whole-word, case-preserving replacer for one set of rules.
+
+    `rules` is a dict or a RulePack. For a dict, the regex is compiled once
+    when the Rewriter is created, and rewrite() goes over the text in a
+    single pass. A RulePack of up to RULEPACK_REGEX_MAX_KEYS keys is read
+    into a dict and gets the same regex, compiled the first time it is
+    used; a bigger pack is looked up word by word, so nothing grows with
+    the number of rules.
+    """
+
+    def __init__(self, rules):
+        self.pack = None
+        self.pattern = None
+        if isinstance(rules, RulePack):
+            self.pack = rules
+            self.rules = dict(rules.items()) if len(rules) <= RULEPACK_REGEX_MAX_KEYS else None
+            self.version = rules.digest
+            # pack keys are words, so they never contain '.'
+            self.has_period_keys = False
+            self.has_period_values = bool(rules.flags & RULEPACK_PERIOD_VALUES)
+            self.single_words = rules.max_words <= 1
+            self.pattern_built = False
+            return
+        self.rules = {k.lower(): v for k, v in rules.items() if k}
+        self.version = hashlib.sha1(json.dumps(self.rules, sort_keys=True).encode('utf-8')).hexdigest()
+        # rules containing '.' could match across sentences, and
+        # replacements containing '.' add sentence breaks
+        self.has_period_keys = any('.' in k for k in self.rules)
+        self.has_period_values = any('.' in v for v in self.rules.values())
+        # every key is one whole word (then a match is exactly one \w+ run)
+        self.single_words = all(_WORD_RE.fullmatch(k) for k in self.rules)
+        if self.rules:
+            # (?<!\w) and (?!\w) stop "ok" from matching inside "book"
+            body = trie_pattern(self.rules)
+            self.pattern = re.compile(r'(?<!\w)' + body + r'(?!\w)', re.IGNORECASE)
+
+    def uses_regex(self):
+        """Whether rewrite() matches with one compiled regex (see the class doc)."""
+        return self.rules is not None
+
+    def _pack_pattern(self):
+        if not self.pattern_built:
+            if self.rules:
+                body = trie_pattern(self.rules)
+                self.pattern = re.compile(r'(?<!\w)' + body + r'(?!\w)', re.IGNORECASE)
+            self.pattern_built = True
+        return self.pattern
+
+    def lookup(self, key):
+        """Replacement for one lowercase word, or None."""
+        if self.rules is None:
+            return self.pack.get(key)
+        return self.rules.get(key)
+
+    def _replace(self, match):
+        found = match.group(0)
+        new = self.rules.get(found.lower())
+        if new is None:
+            return found
+        return match_case(found, new)
+
+    def _replace_word(self, match):
+        found = match.group(0)
+        new = self.pack.get(found.lower())
+        if new is None:
+            return found
+        return match_case(found, new)
+
+    def _rewrite_phrases(self, text):
+        """Pack lookup that also finds keys of several words (longest wins)."""
+        words = list(_WORD_RE.finditer(text))
+        max_words = self.pack.max_words
+        lookup = self.pack.lookup
+        out = []
+        pos = 0
+        i = 0
+        while i < len(words):
+            first = words[i]
+            found = first.group(0)
+            new, longer = lookup(found.lower())
+            best = (1, found, new) if new is not None else None
+            n = 1
+            # extend while a longer key could still match and the next word
+            # follows after exactly one space
+            while (longer and n < max_words and i + n < len(words)
+                   and words[i + n].start() == words[i + n - 1].end() + 1
+                   and text[words[i + n - 1].end()] == ' '):
+                n += 1
+                found = text[first.start():words[i + n - 1].end()]
+                new, longer = lookup(found.lower())
+                if new is not None:
+                    best = (n, found, new)
+            if best is None:
+                i += 1
+                continue
+            n, found, new = best
+            out.append(text[pos:first.start()])
+            out.append(match_case(found, new))
+            pos = words[i + n - 1].end()
+            i += n
+        out.append(text[pos:])
+        return ''.join(out)
+
+    def rewrite(self, text: str) -> str:
+        if self.pack is not None:
+            if self.rules is not None:
+                pattern = self._pack_pattern()
+                return pattern.sub(self._replace, text) if pattern is not None else text
+            if self.pack.max_words > 1:
+                return self._rewrite_phrases(text)
+            return _WORD_RE.sub(self._replace_word, text)
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._replace, text)
@@ -0,0 +1,322 @@
+"""Benchmarks for the Lingrow suggestion functions, saving and image loading.
+
+Run it from the project root:
+  python3 scripts/benchmark.py                     # full run, prints a summary
+  python3 scripts/benchmark.py --quick             # smaller sizes, a few seconds
+  python3 scripts/benchmark.py -o bench.json       # also save the results
+  python3 scripts/benchmark.py --compare old.json  # show changes against an earlier run
+
+The text corpus is made up from a fixed random seed, so two runs on the same
+machine measure the same work. Image benchmarks need Pillow and are skipped
+without it.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# make the app modules importable when run as scripts/benchmark.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+import images  # noqa: E402
+import storage  # noqa: E402
+import suggestions  # noqa: E402
+
+
+WORDS = ('the', 'a', 'I', 'we', 'you', 'write', 'learn', 'language', 'friend', 'today',
+         'new', 'class', 'teacher', 'about', 'really', 'think', 'because', 'when',
+         'book', 'climate', 'okay', 'people', 'very', 'good', 'work', 'email')
+
+
+# --- Synthetic corpus ---------------------------------------------------------
+
+def make_sentence(rng, rule_words, rule_share):
+    """One sentence of 5-20 words; about `rule_share` of them hit a rule."""
+    words = []
+    for _ in range(rng.randint(5, 20)):
+        if rule_words and rng.random() < rule_share:
+            word = rng.choice(rule_words)
+        else:
+            word = rng.choice(WORDS)
+        words.append(word.capitalize() if rng.random() < 0.05 else word)
+    if rng.random() < 0.3:
+        words.insert(rng.randint(1, len(words)), ',')
+    return ' '.join(words)
+
+
+def make_corpus(seed, quick=False):
+    """Return {kind: [texts]} for short messages, long essays and rule-heavy texts."""
+    rng = random.Random(seed)
+    rule_words = list(suggestions.PROFESSIONAL_REPLACEMENTS) + list(suggestions.CULTURAL_MAP)
+    n_short = 200 if quick else 2000
+    n_long = 5 if quick else 20
+    essay_sentences = 300 if quick else 2000
+    corpus = {
+        'short': [make_sentence(rng, rule_words, 0.1) for _ in range(n_short)],
+        'essay': ['. '.join(make_sentence(rng, rule_words, 0.05) for _ in range(essay_sentences)) + '.'
+                  for _ in range(n_long)],
+        'rule_heavy': ['. '.join(make_sentence(rng, rule_words, 0.6) for _ in range(50)) + '.'
+                       for _ in range(n_short // 10)],
+    }
+    return corpus
+
+
+# --- Helpers ------------------------------------------------------------------
+
+def percentiles(samples):
+    """p50/p90/p99/max of a list of seconds, in milliseconds."""
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'p50_ms': round(pick(0.50), 4),
+        'p90_ms': round(pick(0.90), 4),
+        'p99_ms': round(pick(0.99), 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+    }
+
+
+def time_calls(func, inputs):
+    """Call func on every input; return latency stats and throughput."""
+    samples = []
+    chars = 0
+    total_start = time.perf_counter()
+    for text in inputs:
+        start = time.perf_counter()
+        func(text)
+        samples.append(time.perf_counter() - start)
+        chars += len(text)
+    total = time.perf_counter() - total_start
+    result = percentiles(samples)
+    result['calls'] = len(samples)
+    result['calls_per_s'] = round(len(samples) / total, 1) if total else None
+    result['mb_per_s'] = round(chars / total / 1e6, 3) if total else None
+    return result
+
+
+# --- Benchmarks ---------------------------------------------------------------
+
+def bench_suggestions(corpus):
+    results = {}
+    for style, func in suggestions.SUGGESTION_FUNCTIONS.items():
+        for kind, texts in corpus.items():
+            results[f'{style}/{kind}'] = time_calls(func, texts)
+    # all three styles at once (one shared pass, like the batch mode and the
+    # "Compare all" button) against calling the three functions in turn
+    functions = list(suggestions.SUGGESTION_FUNCTIONS.values())
+    for kind, texts in corpus.items():
+        separate = time_calls(lambda text: [func(text) for func in functions], texts)
+        shared = time_calls(suggestions.suggest_all, texts)
+        shared['speedup'] = round(shared['calls_per_s'] / separate['calls_per_s'], 2)
+        results[f'suggest_separate/{kind}'] = separate
+        results[f'suggest_all/{kind}'] = shared
+    return results
+
+
+def bench_save(sizes, samples_per_size=200):
+    """Time save_entry once the history already holds `size` entries."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = storage.Journal(path=os.path.join(tmp, 'saved.jsonl'), legacy_path=None)
+        old_journal = storage._journal
+        storage._journal = journal
+        try:
+            count = 0
+            for size in sorted(sizes):
+                # grow the history up to `size` entries
+                while count < size:
+                    storage.save_entry('bench', f'entry {count}', {'preview': 'text'})
+                    count += 1
+                samples = []
+                for i in range(samples_per_size):
+                    start = time.perf_counter()
+                    storage.save_entry('bench', f'sample {i}', {'preview': 'text'})
+                    samples.append(time.perf_counter() - start)
+                count += samples_per_size
+                start = time.perf_counter()
+                loaded = sum(1 for _ in storage.load_saved())
+                load_s = time.perf_counter() - start
+                stats = percentiles(samples)
+                stats['history'] = size
+                stats['load_all_ms'] = round(load_s * 1000, 3)
+                stats['loaded'] = loaded
+                results[f'save_entry/{size}'] = stats
+        finally:
+            journal.close()
+            storage._journal = old_journal
+    return results
+
+
+def bench_images(repeats=20):
+    """Decode and thumbnail images made by generate_assets.py."""
+    try:
+        from PIL import Image
+        import generate_assets
+    except Exception as e:
+        return {'skipped': f'Pillow not available ({e})'}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        logo = os.path.join(tmp, 'logo.png')
+        icon = os.path.join(tmp, 'icon.png')
+        photo = os.path.join(tmp, 'photo.png')
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_assets.make_logo(logo)
+            generate_assets.make_icon(icon, 'home')
+        # a phone-photo sized image: the logo scaled up to 4000x3000
+        big = Image.open(logo).convert('RGB').resize((4000, 3000))
+        big.save(photo)
+        jpeg = os.path.join(tmp, 'photo.jpg')
+        big.save(jpeg, quality=90)
+
+        for name, path, boxes in (('logo', logo, [(64, 64), (48, 48)]),
+                                  ('icon', icon, [(36, 36)]),
+                                  ('photo', photo, [(48, 48), (360, 200)]),
+                                  ('jpeg', jpeg, [(48, 48), (360, 200)])):
+            decode = []
+            thumbs = []
+            for _ in range(repeats if name != 'photo' else max(1, repeats // 4)):
+                start = time.perf_counter()
+                img = images.open_image_file(path)
+                decode.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                for box in boxes:
+                    copy = img.copy()
+                    copy.thumbnail(box)
+                thumbs.append(time.perf_counter() - start)
+            # through the shared cache: first call decodes, the rest are hits
+            cache = images.ImageCache(disk_dir=None)
+            cached = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                cache.thumbnails(path, boxes)
+                cached.append(time.perf_counter() - start)
+            results[f'image/{name}/decode'] = percentiles(decode)
+            results[f'image/{name}/thumbnail'] = percentiles(thumbs)
+            results[f'image/{name}/cached'] = percentiles(cached)
+            results[f'image/{name}/cached']['decodes'] = cache.decodes
+        for name, path in (('photo', photo), ('jpeg', jpeg)):
+            results.update(bench_image_memory(name, path))
+    return results
+
+
+# Run in a fresh process so the peak memory is that of just this work.
+# "full" is the old way (decode at full size, then copy and thumbnail);
+# "reduced" is ImageCache.thumbnails, which decodes at reduced size.
+_MEMORY_SCRIPT = """
+import resource, sys
+sys.path.insert(0, sys.argv[1])
+import images
+Image, _ = images.load_pil()
+mode, path = sys.argv[2], sys.argv[3]
+boxes = [(48, 48), (360, 200)]
+if mode == 'full':
+    img = images.open_image_file(path)
+    thumbs = []
+    for box in boxes:
+        copy = img.copy()
+        copy.thumbnail(box)
+        thumbs.append(copy)
+elif mode == 'reduced':
+    images.ImageCache(disk_dir=None).thumbnails(path, boxes)
+try:
+    # ru_maxrss can include the parent's peak on Linux; VmHWM is this process only
+    with open('/proc/self/status') as f:
+        print([line.split()[1] for line in f if line.startswith('VmHWM:')][0])
+except OSError:
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def bench_image_memory(name, path):
+    """Peak memory (MB above a process that only imports images) per decode mode."""
+    try:
+        import resource  # noqa: F401  (not on Windows)
+        import subprocess
+    except ImportError:
+        return {}
+
+    def peak_kb(mode):
+        out = subprocess.run([sys.executable, '-c', _MEMORY_SCRIPT, ROOT, mode, path],
+                             capture_output=True, text=True, check=True).stdout
+        return int(out.split()[-1])
+
+    base = peak_kb('none')
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS
+    return {f'image/{name}/peak_mb/{mode}': {'peak_mb': round((peak_kb(mode) - base) * 1024 / scale / 1024, 1)}
+            for mode in ('full', 'reduced')}
+
+
+# --- Reporting ----------------------------------------------------------------
+
+def compare(current, baseline):
+    """Print p50 changes between two result files."""
+    old = baseline.get('results', {})
+    print('\nChange against baseline (p50):')
+    for name, stats in current['results'].items():
+        before = old.get(name, {}).get('p50_ms')
+        after = stats.get('p50_ms')
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        print(f'  {name:36s} {before:10.4f} -> {after:10.4f} ms  ({change:+.1f}%)')
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description='Lingrow benchmarks')
+    parser.add_argument('--quick', action='store_true', help='smaller corpus and history sizes')
+    parser.add_argument('--seed', type=int, default=1234, help='random seed for the corpus')
+    parser.add_argument('--output', '-o', help='write results to this JSON file')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--only', choices=('suggestions', 'save', 'images'), action='append',
+                        help='run only some benchmarks (can be repeated)')
+    args = parser.parse_args(argv)
+
+    only = set(args.only or ('suggestions', 'save', 'images'))
+    sizes = [10, 100, 1000, 10000] if args.quick else [10, 100, 1000, 10000, 100000]
+    results = {}
+    if 'suggestions' in only:
+        results.update(bench_suggestions(make_corpus(args.seed, args.quick)))
+    if 'save' in only:
+        results.update(bench_save(sizes))
+    if 'images' in only:
+        results.update(bench_images(5 if args.quick else 20))
+
+    report = {
+        'created': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'quick': args.quick,
+        'results': results,
+    }
+    for name, stats in results.items():
+        if 'p50_ms' in stats:
+            extra = f"  {stats['calls_per_s']} calls/s" if 'calls_per_s' in stats else ''
+            if 'speedup' in stats:
+                extra += f"  ({stats['speedup']}x)"
+            print(f"{name:36s} p50 {stats['p50_ms']:10.4f} ms  p99 {stats['p99_ms']:10.4f} ms{extra}")
+        else:
+            print(f'{name:36s} {stats}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print('\nSaved', args.output)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == '__main__':
+    main_cli()
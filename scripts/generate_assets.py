@@ -4,7 +4,23 @@ This script uses Pillow to draw a friendly logo and four small icons.
 Run it from the project root (it will create `icons/` and `assets/`).
 
 Usage:
-  python3 scripts/generate_assets.py
+  python3 scripts/generate_assets.py                 # build what changed
+  python3 scripts/generate_assets.py --force         # rebuild everything
+  python3 scripts/generate_assets.py --themes default --densities 1,2 --jobs 4
+
+Every image is made for each theme (color set) and density (1x, 2x, 3x).
+The default theme at 1x keeps the original file names (`icons/home.png`,
+`assets/lingrow_logo.png`); 2x and 3x add `@2x`/`@3x`, and other themes go
+under `icons/themes/<theme>/` and `assets/themes/<theme>/`.
+
+The build is incremental: each output is keyed by a hash of everything that
+goes into it (its parameters and the drawing code). The hashes are kept in
+`assets/.asset_manifest.json`, and an output whose hash has not changed is
+skipped. Images that do need building are drawn in parallel.
+
+The nav icons are also packed into one sprite atlas per theme and density
+(`icons/nav_atlas.png` plus `icons/nav_atlas.json` with each icon's
+rectangle), so the app can load all of them with a single decode.
 
 If Pillow is not installed, install it first:
   pip install pillow
@@ -13,8 +29,25 @@ The generated images are simple programmatic designs intended as placeholders
 you can replace later with real graphics from Canva.
 """
 from PIL import Image, ImageDraw, ImageFont
+import argparse
+import hashlib
+import inspect
+import json
 import os
 
+MANIFEST_PATH = os.path.join('assets', '.asset_manifest.json')
+ICON_KINDS = ('home', 'explore', 'write', 'profile')
+DENSITIES = (1, 2, 3)
+ICON_SIZE = (128, 128)
+LOGO_SIZE = (420, 200)
+
+# Color sets; 'default' matches the app's colors
+THEMES = {
+    'default': {'bg': (253, 232, 232), 'accent': (127, 166, 173)},
+    'dark': {'bg': (40, 44, 52), 'accent': (180, 210, 215)},
+    'rose': {'bg': (255, 240, 243), 'accent': (196, 112, 132)},
+}
+
 
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
@@ -26,17 +59,32 @@ def save(img, path):
     print('Saved', path)
 
 
-def make_logo(path, size=(420, 200)):
+def load_font(size):
+    try:
+        return ImageFont.truetype('DejaVuSans-Bold.ttf', size)
+    except Exception:
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            # older Pillow: only one default size
+            return ImageFont.load_default()
+
+
+def make_logo(path, size=LOGO_SIZE, bg=THEMES['default']['bg'], accent=THEMES['default']['accent']):
     w, h = size
-    bg = (253, 232, 232)  # soft pink
-    accent = (127, 166, 173)  # muted teal
+    # all measurements below are for a 420x200 logo and scale with the height
+    scale = h / 200
+
+    def px(v):
+        return int(round(v * scale))
+
     img = Image.new('RGBA', (w, h), bg)
     draw = ImageDraw.Draw(img)
 
     # draw a simple open-book icon on left
     book_w = int(w * 0.32)
     book_h = int(h * 0.7)
-    bx = 28
+    bx = px(28)
     by = (h - book_h) // 2
     # left page
     draw.polygon([(bx, by + book_h//2), (bx + book_w//2, by), (bx + book_w//2, by + book_h)], fill=(255, 255, 255))
@@ -44,25 +92,28 @@ def make_logo(path, size=(420, 200)):
     rx = bx + book_w//2
     draw.polygon([(rx, by), (rx + book_w//2, by + book_h//2), (rx, by + book_h)], fill=(255, 255, 255))
     # outline
-    draw.line([(bx, by + book_h//2), (bx + book_w//2, by), (rx + book_w//2, by + book_h//2)], fill=accent, width=4)
-    draw.line([(bx + book_w//2, by + book_h), (rx + book_w//2, by + book_h//2)], fill=accent, width=4)
+    draw.line([(bx, by + book_h//2), (bx + book_w//2, by), (rx + book_w//2, by + book_h//2)], fill=accent, width=px(4))
+    draw.line([(bx + book_w//2, by + book_h), (rx + book_w//2, by + book_h//2)], fill=accent, width=px(4))
 
     # text "Lingrow"
-    try:
-        font = ImageFont.truetype('DejaVuSans-Bold.ttf', 48)
-    except Exception:
-        font = ImageFont.load_default()
-    tx = bx + book_w + 20
-    ty = h//2 - 24
+    font = load_font(px(48))
+    tx = bx + book_w + px(20)
+    ty = h//2 - px(24)
     draw.text((tx, ty), 'Lingrow', font=font, fill=accent)
 
     save(img, path)
 
 
-def make_icon(path, kind, size=(128, 128)):
+def draw_icon(kind, size=ICON_SIZE, accent=THEMES['default']['accent']):
+    """Draw one nav icon and return it as an RGBA image."""
     w, h = size
+    # all measurements below are for a 128x128 icon and scale with the width
+    scale = w / 128
+
+    def px(v):
+        return int(round(v * scale))
+
     bg = (255, 255, 255, 0)
-    accent = (127, 166, 173)
     img = Image.new('RGBA', (w, h), bg)
     draw = ImageDraw.Draw(img)
     cx, cy = w//2, h//2
@@ -70,26 +121,187 @@ def make_icon(path, kind, size=(128, 128)):
     if kind == 'home':
         # simple house
         roof_h = h//3
-        draw.polygon([(cx, cy - roof_h), (cx - 36, cy), (cx + 36, cy)], fill=accent)
-        draw.rectangle([cx - 40, cy, cx + 40, cy + 40], outline=accent, width=6)
+        draw.polygon([(cx, cy - roof_h), (cx - px(36), cy), (cx + px(36), cy)], fill=accent)
+        draw.rectangle([cx - px(40), cy, cx + px(40), cy + px(40)], outline=accent, width=px(6))
     elif kind == 'explore':
         # globe: circle with simple grid
-        r = 40
-        draw.ellipse([cx - r, cy - r, cx + r, cy + r], outline=accent, width=6)
-        draw.line([cx, cy - r, cx, cy + r], fill=accent, width=3)
-        draw.line([cx - r, cy, cx + r, cy], fill=accent, width=3)
+        r = px(40)
+        draw.ellipse([cx - r, cy - r, cx + r, cy + r], outline=accent, width=px(6))
+        draw.line([cx, cy - r, cx, cy + r], fill=accent, width=px(3))
+        draw.line([cx - r, cy, cx + r, cy], fill=accent, width=px(3))
     elif kind == 'write':
         # pencil
-        draw.line([cx - 36, cy + 18, cx + 36, cy - 18], fill=accent, width=8)
-        draw.polygon([(cx + 36, cy - 18), (cx + 42, cy - 12), (cx + 30, cy - 6)], fill=accent)
+        draw.line([cx - px(36), cy + px(18), cx + px(36), cy - px(18)], fill=accent, width=px(8))
+        draw.polygon([(cx + px(36), cy - px(18)), (cx + px(42), cy - px(12)), (cx + px(30), cy - px(6))], fill=accent)
     elif kind == 'profile':
         # head + shoulders
-        draw.ellipse([cx - 28, cy - 34, cx + 28, cy + -6], outline=accent, width=6)
-        draw.rectangle([cx - 36, cy - 6, cx + 36, cy + 30], outline=accent, width=6)
+        draw.ellipse([cx - px(28), cy - px(34), cx + px(28), cy - px(6)], outline=accent, width=px(6))
+        draw.rectangle([cx - px(36), cy - px(6), cx + px(36), cy + px(30)], outline=accent, width=px(6))
     else:
-        draw.text((10, 10), kind, fill=accent)
+        draw.text((px(10), px(10)), kind, fill=accent)
+
+    return img
+
+
+def make_icon(path, kind, size=ICON_SIZE, accent=THEMES['default']['accent']):
+    save(draw_icon(kind, size, accent), path)
+
+
+def pack_grid(sizes, padding):
+    """Place rectangles of the given (w, h) sizes in rows of a square-ish grid.
+
+    Returns (atlas width, atlas height, [(x, y) for each rectangle]).
+    """
+    columns = max(1, int(len(sizes) ** 0.5 + 0.999))
+    cell_w = max(w for w, _ in sizes) + padding
+    cell_h = max(h for _, h in sizes) + padding
+    positions = [((i % columns) * cell_w + padding, (i // columns) * cell_h + padding)
+                 for i in range(len(sizes))]
+    rows = (len(sizes) + columns - 1) // columns
+    return columns * cell_w + padding, rows * cell_h + padding, positions
+
+
+def make_atlas(path, kinds=ICON_KINDS, size=ICON_SIZE, accent=THEMES['default']['accent'], padding=4):
+    """Draw all icons into one image plus a JSON file with their rectangles.
+
+    The JSON file has the same name as the image with `.json`, and looks like
+    {"image": "nav_atlas.png", "sprites": {"home": [x, y, w, h], ...}}.
+    The transparent padding keeps icons from bleeding into each other when
+    the atlas is scaled.
+    """
+    icons = [draw_icon(kind, size, accent) for kind in kinds]
+    atlas_w, atlas_h, positions = pack_grid([icon.size for icon in icons], padding)
+    atlas = Image.new('RGBA', (atlas_w, atlas_h), (255, 255, 255, 0))
+    sprites = {}
+    for kind, icon, (x, y) in zip(kinds, icons, positions):
+        atlas.paste(icon, (x, y))
+        sprites[kind] = [x, y, icon.size[0], icon.size[1]]
+    save(atlas, path)
+    manifest_path = os.path.splitext(path)[0] + '.json'
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'image': os.path.basename(path), 'sprites': sprites}, f, indent=2)
+    print('Saved', manifest_path)
 
-    save(img, path)
+
+# --- Incremental build ----------------------------------------------------------
+
+def output_path(folder, name, theme, density):
+    """Where one image goes, e.g. icons/home@2x.png or icons/themes/dark/home.png."""
+    suffix = '' if density == 1 else f'@{density}x'
+    if theme != 'default':
+        folder = os.path.join(folder, 'themes', theme)
+    return os.path.join(folder, f'{name}{suffix}.png')
+
+
+def plan_jobs(themes, densities):
+    """List every image to build as a dict of its parameters."""
+    jobs = []
+    for theme in themes:
+        colors = THEMES[theme]
+        for density in densities:
+            jobs.append({
+                'type': 'logo',
+                'path': output_path('assets', 'lingrow_logo', theme, density),
+                'size': [LOGO_SIZE[0] * density, LOGO_SIZE[1] * density],
+                'bg': list(colors['bg']),
+                'accent': list(colors['accent']),
+            })
+            for kind in ICON_KINDS:
+                jobs.append({
+                    'type': 'icon',
+                    'path': output_path('icons', kind, theme, density),
+                    'kind': kind,
+                    'size': [ICON_SIZE[0] * density, ICON_SIZE[1] * density],
+                    'accent': list(colors['accent']),
+                })
+            # all nav icons packed into one image, loaded with a single decode
+            jobs.append({
+                'type': 'atlas',
+                'path': output_path('icons', 'nav_atlas', theme, density),
+                'kinds': list(ICON_KINDS),
+                'size': [ICON_SIZE[0] * density, ICON_SIZE[1] * density],
+                'accent': list(colors['accent']),
+                'padding': 4 * density,
+            })
+    return jobs
+
+
+# the functions whose code decides what each kind of job draws, including
+# the helpers they call (a new font or save format changes the output too)
+JOB_DRAWERS = {
+    'logo': (load_font, save, make_logo),
+    'icon': (save, draw_icon, make_icon),
+    'atlas': (save, draw_icon, pack_grid, make_atlas),
+}
+
+
+def job_key(job):
+    """Hash of the job's parameters and the code that draws it."""
+    code = ''.join(inspect.getsource(func) for func in JOB_DRAWERS[job['type']])
+    data = json.dumps(job, sort_keys=True) + code
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def build_job(job):
+    """Draw one image (runs in a worker process). Returns its path."""
+    if job['type'] == 'logo':
+        make_logo(job['path'], tuple(job['size']), tuple(job['bg']), tuple(job['accent']))
+    elif job['type'] == 'atlas':
+        make_atlas(job['path'], tuple(job['kinds']), tuple(job['size']), tuple(job['accent']), job['padding'])
+    else:
+        make_icon(job['path'], job['kind'], tuple(job['size']), tuple(job['accent']))
+    return job['path']
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    ensure_dir(os.path.dirname(path))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def build(themes=tuple(THEMES), densities=DENSITIES, jobs=None, force=False):
+    """Build the images that are missing or out of date.
+
+    Returns (built, skipped) counts.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    manifest = load_manifest()
+    todo = []
+    skipped = 0
+    for job in plan_jobs(themes, densities):
+        key = job_key(job)
+        outputs = [job['path']]
+        if job['type'] == 'atlas':
+            outputs.append(os.path.splitext(job['path'])[0] + '.json')
+        if not force and manifest.get(job['path']) == key and all(os.path.exists(p) for p in outputs):
+            skipped += 1
+            continue
+        todo.append((job, key))
+
+    if todo:
+        workers = jobs or os.cpu_count() or 1
+        if workers == 1 or len(todo) == 1:
+            for job, _ in todo:
+                build_job(job)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                # list() waits for every job and re-raises the first error
+                list(pool.map(build_job, [job for job, _ in todo]))
+        for job, key in todo:
+            manifest[job['path']] = key
+        save_manifest(manifest)
+    return len(todo), skipped
 
 
 def main():
@@ -99,13 +311,27 @@ def main():
         print('Pillow is required to generate assets. Install with: pip install pillow')
         return
 
+    parser = argparse.ArgumentParser(description='Generate Lingrow example assets')
+    parser.add_argument('--force', action='store_true', help='rebuild everything')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--themes', default=','.join(THEMES),
+                        help='comma-separated themes to build (default: all)')
+    parser.add_argument('--densities', default=','.join(str(d) for d in DENSITIES),
+                        help='comma-separated densities to build, e.g. 1,2,3')
+    args = parser.parse_args()
+
+    themes = [t for t in args.themes.split(',') if t]
+    unknown = [t for t in themes if t not in THEMES]
+    if unknown:
+        parser.error(f"unknown theme(s): {', '.join(unknown)}")
+    densities = [int(d) for d in args.densities.split(',') if d]
+
     ensure_dir('icons')
     ensure_dir('assets')
-    make_logo('assets/lingrow_logo.png')
-    for k in ('home', 'explore', 'write', 'profile'):
-        make_icon(f'icons/{k}.png', k)
+    built, skipped = build(themes, densities, args.jobs, args.force)
 
-    print('\nGenerated example assets in `assets/` and `icons/`.')
+    print(f'\nGenerated {built} asset(s) in `assets/` and `icons/` ({skipped} already up to date).')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,107 @@
+"""Load test for the local Lingrow suggestion service.
+
+Start the service first, then run this from the project root:
+  python3 main.py --serve 127.0.0.1:8765
+  python3 scripts/load_test.py --concurrency 32 --requests 5000
+
+Each of the `--concurrency` clients keeps one connection open and sends
+requests one after another, so the number of requests in flight stays fixed.
+It prints latency percentiles (p50/p90/p99) and throughput, and can save
+them as JSON with --output.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import make_corpus, percentiles  # noqa: E402
+
+
+async def send(reader, writer, host, path, payload):
+    """Send one POST on an open connection; return (status, body bytes)."""
+    body = json.dumps(payload).encode('utf-8')
+    writer.write((f'POST {path} HTTP/1.1\r\nHost: {host}\r\n'
+                  f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, path, make_payload, counter, total, samples, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while next(counter) < total:
+            start = time.perf_counter()
+            status, _ = await send(reader, writer, host, path, make_payload())
+            samples.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, total, path, texts, style):
+    counter = itertools.count()
+    text_cycle = itertools.cycle(texts)
+
+    def make_payload():
+        payload = {'text': next(text_cycle)}
+        if path == '/suggest':
+            payload['style'] = style
+        return payload
+
+    samples = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, path, make_payload, counter, total, samples, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = percentiles(samples)
+    result.update(requests=len(samples), concurrency=concurrency, seconds=round(elapsed, 3),
+                  requests_per_s=round(len(samples) / elapsed, 1), statuses=statuses)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Lingrow suggestion service')
+    parser.add_argument('--address', default='127.0.0.1:8765', help='service HOST:PORT')
+    parser.add_argument('--concurrency', '-c', type=int, default=32, help='requests in flight at once')
+    parser.add_argument('--requests', '-n', type=int, default=5000, help='total requests to send')
+    parser.add_argument('--style', default='professional', help="style for /suggest, or 'all' for /suggest_all")
+    parser.add_argument('--corpus', default='short', choices=('short', 'essay', 'rule_heavy'),
+                        help='kind of made-up text to send')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', '-o', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    host, _, port = args.address.rpartition(':')
+    texts = make_corpus(args.seed, quick=True)[args.corpus]
+    path = '/suggest_all' if args.style == 'all' else '/suggest'
+    result = asyncio.run(run(host, int(port), args.concurrency, args.requests, path, texts, args.style))
+
+    print(f"{result['requests']} requests, concurrency {result['concurrency']}: "
+          f"{result['requests_per_s']} req/s")
+    print(f"p50 {result['p50_ms']} ms  p90 {result['p90_ms']} ms  p99 {result['p99_ms']} ms  "
+          f"max {result['max_ms']} ms")
+    print('status codes:', result['statuses'])
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print('Saved', args.output)
+
+
+if __name__ == '__main__':
+    main()
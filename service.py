@@ -0,0 +1,271 @@
+"""Local HTTP/JSON suggestion service (--serve)."""
+import json
+
+from metrics import METRICS
+from result_cache import cached_suggestion, get_worker_pool, result_cache_stats
+from storage import get_journal, save_entry
+from suggestions import SUGGESTION_FUNCTIONS
+
+SERVICE_BATCH_WINDOW = 0.002  # seconds to wait for more requests to batch together
+SERVICE_MAX_BATCH = 64
+SERVICE_QUEUE_SIZE = 1024  # waiting requests (and saves) before answering 503
+SERVICE_MAX_BODY = 8 * 1024 * 1024
+
+
+# --- Local suggestion service ------------------------------------------------
+# `python main.py --serve 127.0.0.1:8765` runs a small HTTP/JSON server so
+# several front ends can share one warmed-up engine (caches stay hot).
+#
+#   POST /suggest      {"style": "professional", "text": "..."} -> {"result": "..."}
+#   POST /suggest_all  {"text": "..."}  -> {"professional": ..., "neutral": ..., "cultural": ...}
+#   POST /save         {"title": ..., "original": ..., "suggestions": {...}} -> 202
+#   GET  /stats        counters
+#
+# Requests that arrive within a few milliseconds of each other are run as
+# one batch on the worker thread. The queues have a fixed size; when they
+# are full the server answers 503 right away instead of piling up work.
+# Saves go to one writer task, so save_entry is only ever called from one
+# thread, in arrival order. asyncio is imported inside the functions that
+# use it, so the window does not pay for it at startup.
+
+def _run_suggestion_batch(items):
+    """Work out a batch of (style, text) pairs; equal pairs are computed once."""
+    done = {}
+    out = []
+    for item in items:
+        if item not in done:
+            style, text = item
+            try:
+                if style == 'all':
+                    value = {name: cached_suggestion(name, text) for name in SUGGESTION_FUNCTIONS}
+                else:
+                    value = cached_suggestion(style, text)
+                done[item] = (True, value)
+            except Exception as e:
+                done[item] = (False, str(e))
+        out.append(done[item])
+    return out
+
+
+class SuggestionService:
+    """asyncio HTTP/JSON server around the suggestion functions and save_entry."""
+
+    def __init__(self, host='127.0.0.1', port=8765, batch_window=SERVICE_BATCH_WINDOW,
+                 max_batch=SERVICE_MAX_BATCH, queue_size=SERVICE_QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.server = None
+        self.tasks = []
+        self.stats = {'requests': 0, 'batches': 0, 'batched_items': 0,
+                      'rejected': 0, 'saves': 0, 'errors': 0}
+
+    async def start(self):
+        from concurrent.futures import ThreadPoolExecutor
+        import asyncio
+        self.queue = asyncio.Queue(self.queue_size)
+        self.save_queue = asyncio.Queue(self.queue_size)
+        self.save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lingrow-writer')
+        self.tasks = [asyncio.create_task(self._batcher()), asyncio.create_task(self._writer())]
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # with port 0 the system picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop accepting connections, finish queued saves, then stop the tasks."""
+        import asyncio
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.save_queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.save_executor.shutdown(wait=True)
+        get_journal().sync()
+
+    async def _batcher(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            # collect whatever else arrives within the batch window
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.stats['batches'] += 1
+            self.stats['batched_items'] += len(batch)
+            items = [(style, text) for style, text, _ in batch]
+            try:
+                with METRICS.timer('service_batch_seconds'):
+                    results = await loop.run_in_executor(get_worker_pool(), _run_suggestion_batch, items)
+            except Exception as e:
+                results = [(False, str(e))] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _writer(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            title, original, suggestions = await self.save_queue.get()
+            try:
+                await loop.run_in_executor(self.save_executor, save_entry, title, original, suggestions)
+                self.stats['saves'] += 1
+            except Exception:
+                self.stats['errors'] += 1
+            finally:
+                self.save_queue.task_done()
+
+    async def suggest(self, style, text):
+        """Queue one request and wait for its batch. Raises asyncio.QueueFull."""
+        import asyncio
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((style, text, future))
+        return await future
+
+    async def _route(self, method, path, body):
+        """Return (HTTP status, JSON-able payload) for one request."""
+        import asyncio
+        if method == 'GET' and path == '/stats':
+            stats = dict(self.stats, queued=self.queue.qsize(), queued_saves=self.save_queue.qsize())
+            cache_stats = result_cache_stats()
+            if cache_stats is not None:
+                stats['result_cache'] = cache_stats
+            return 200, stats
+        if method != 'POST':
+            return 404, {'error': 'not found'}
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': 'body must be JSON'}
+        if not isinstance(data, dict):
+            return 400, {'error': 'body must be a JSON object'}
+
+        if path == '/save':
+            title = data.get('title', 'untitled')
+            original = data.get('original', '')
+            suggestions = data.get('suggestions', {})
+            if not isinstance(title, str) or not isinstance(original, str):
+                return 400, {'error': '"title" and "original" must be strings'}
+            if not isinstance(suggestions, dict) or not all(
+                    isinstance(v, str) for v in suggestions.values()):
+                return 400, {'error': '"suggestions" must be an object of strings'}
+            try:
+                self.save_queue.put_nowait((title, original, suggestions))
+            except asyncio.QueueFull:
+                self.stats['rejected'] += 1
+                return 503, {'error': 'busy, try again'}
+            return 202, {'queued': True}
+
+        if path not in ('/suggest', '/suggest_all'):
+            return 404, {'error': 'not found'}
+        text = data.get('text')
+        style = 'all' if path == '/suggest_all' else data.get('style', 'professional')
+        if not isinstance(text, str):
+            return 400, {'error': '"text" must be a string'}
+        if style != 'all' and style not in SUGGESTION_FUNCTIONS:
+            return 400, {'error': f'unknown style {style!r}'}
+        try:
+            ok, value = await self.suggest(style, text)
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            return 503, {'error': 'busy, try again'}
+        if not ok:
+            self.stats['errors'] += 1
+            return 500, {'error': value}
+        return 200, value if style == 'all' else {'result': value}
+
+    async def _handle_client(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: one JSON request/response at a time."""
+        import asyncio
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # without a usable length the body can't be skipped, so close
+                    status, payload = 400, {'error': 'bad Content-Length'}
+                    keep_alive = False
+                elif length > SERVICE_MAX_BODY:
+                    status, payload = 413, {'error': 'request too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    self.stats['requests'] += 1
+                    status, payload = await self._route(method, path.split('?')[0], body)
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and version == 'HTTP/1.1')
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                head = (f'HTTP/1.1 {status} {SERVICE_STATUS_TEXT.get(status, "OK")}\r\n'
+                        f'Content-Type: application/json; charset=utf-8\r\n'
+                        f'Content-Length: {len(data)}\r\n'
+                        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n')
+                if status == 503:
+                    head += 'Retry-After: 1\r\n'
+                writer.write(head.encode('latin-1') + b'\r\n' + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+SERVICE_STATUS_TEXT = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+                       413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def run_service(address='127.0.0.1:8765'):
+    """Run the suggestion service until Ctrl+C."""
+    import asyncio
+    host, _, port = address.rpartition(':')
+
+    async def main_loop():
+        import signal
+        service = await SuggestionService(host or '127.0.0.1', int(port)).start()
+        print(f'Lingrow service on http://{service.host}:{service.port}')
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # not available on Windows; Ctrl+C still ends asyncio.run
+                pass
+        try:
+            await stop.wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(main_loop())
+    except KeyboardInterrupt:
+        pass
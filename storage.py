@@ -0,0 +1,720 @@
+"""Saving entries: an append-only JSONL journal, and a word index over it
+for the history browser and search.
+"""
+import atexit
+import bisect
+import itertools
+import json
+import os
+import re
+import threading
+import time
+try:
+    import fcntl  # file locks, so several processes can share the journal
+except ImportError:  # Windows
+    fcntl = None
+
+from metrics import METRICS, timed
+
+SAVE_FILE = "saved_texts.json"  # old format: one JSON array (migrated once)
+JOURNAL_FILE = "saved_texts.jsonl"
+JOURNAL_FSYNC_EVERY = 32  # entries written between fsync calls
+JOURNAL_FSYNC_INTERVAL = 1.0  # seconds between fsync calls
+OUTPUT_CHUNK_CHARS = 32_768  # characters per chunk (and per saved segment)
+INDEX_FILE = "saved_texts.index.json"
+INDEX_SNAPSHOT_EVERY = 500  # saves between (background) writes of the index file
+INDEX_SNAPSHOT_CHUNK = 20000  # numbers per json.dumps call while writing the index
+
+
+# --- Saved entries --------------------------------------------------------
+# Entries are stored in an append-only journal: one JSON object per line.
+# Saving only appends a line, so it takes the same time no matter how many
+# entries were saved before, and a crash can at most lose the last line.
+
+def migrate_legacy_save_file(legacy_path=SAVE_FILE, journal_path=JOURNAL_FILE):
+    """Copy entries from the old JSON array file into the journal (once).
+
+    The old file is left untouched; the journal existing means the
+    migration already happened. Returns the number of entries copied.
+    """
+    if os.path.exists(journal_path) or not os.path.exists(legacy_path):
+        return 0
+    try:
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return 0
+    if not isinstance(data, list):
+        return 0
+    tmp_path = journal_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in data:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+    return len(data)
+
+
+class TextSegments(list):
+    """A long text kept as a list of pieces instead of one string.
+
+    The journal writes it as a single JSON string, piece by piece, so the
+    whole text never has to be joined in memory.
+    """
+
+
+def split_segments(text, size=OUTPUT_CHUNK_CHARS):
+    """Cut `text` into TextSegments of about `size` characters, at whitespace
+    where possible (so no word is split between two pieces)."""
+    segments = TextSegments()
+    start = 0
+    while len(text) - start > size:
+        end = start + size
+        cut = max(text.rfind('\n', start, end), text.rfind(' ', start, end))
+        if cut > start:
+            end = cut + 1
+        segments.append(text[start:end])
+        start = end
+    segments.append(text[start:])
+    return segments
+
+
+def _has_segments(value):
+    return isinstance(value, TextSegments) or (
+        isinstance(value, dict) and any(_has_segments(v) for v in value.values()))
+
+
+def _encode_json(value):
+    """Yield the JSON for `value` as bytes chunks (TextSegments one piece at a time)."""
+    if isinstance(value, TextSegments):
+        yield b'"'
+        for piece in value:
+            yield json.dumps(piece, ensure_ascii=False)[1:-1].encode('utf-8')
+        yield b'"'
+    elif isinstance(value, dict) and _has_segments(value):
+        sep = b'{'
+        for key, item in value.items():
+            yield sep + json.dumps(key, ensure_ascii=False).encode('utf-8') + b': '
+            yield from _encode_json(item)
+            sep = b', '
+        yield b'}' if sep != b'{' else b'{}'
+    else:
+        yield json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+class Journal:
+    """Append-only store for saved entries.
+
+    Writes are flushed right away, but fsync (the slow part) is grouped:
+    it runs once every `fsync_every` entries or `fsync_interval` seconds,
+    and when the journal is closed.
+
+    The window and `--serve` may write the same file. Every append takes an
+    exclusive lock on the file (flock, where available) and writes at its
+    current end, so each process gets the true offset of its own line.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, legacy_path=SAVE_FILE,
+                 fsync_every=JOURNAL_FSYNC_EVERY, fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.bad_lines = 0
+        # bumped whenever compact() rewrites the file (offsets change)
+        self.generation = 0
+        if legacy_path:
+            migrate_legacy_save_file(legacy_path, path)
+
+    def _lock_file(self):
+        """Open the journal and take the lock appends and compaction share.
+
+        Returns the file; release it with _unlock_file. Another process may
+        have compacted (replaced) the file since it was opened, so the
+        handle is checked against the path once the lock is held.
+        """
+        while True:
+            if self.file is None:
+                self.file = open(self.path, 'a+b')
+            f = self.file
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.path.samestat(os.fstat(f.fileno()), os.stat(self.path)):
+                    return f
+            except FileNotFoundError:
+                pass
+            self._unlock_file(f)
+            f.close()
+            self.file = None
+
+    def _unlock_file(self, f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _sync_locked(self):
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def append(self, entry):
+        """Write one entry and return the byte offset where its line starts.
+
+        TextSegments values are written piece by piece (see _encode_json).
+        """
+        if not _has_segments(entry):
+            chunks = [(json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')]
+        else:
+            chunks = itertools.chain(_encode_json(entry), [b'\n'])
+        with self.lock:
+            f = self._lock_file()
+            try:
+                # the end as it is now, including other processes' lines
+                offset = f.seek(0, os.SEEK_END)
+                if offset:
+                    f.seek(offset - 1)
+                    if f.read(1) != b'\n':
+                        # a crash left a half-written last line; start a new one
+                        f.write(b'\n')
+                        offset += 1
+                    f.seek(offset)
+                try:
+                    for chunk in chunks:
+                        f.write(chunk)
+                    f.flush()
+                except BaseException:
+                    # never leave half a line behind
+                    f.flush()
+                    f.truncate(offset)
+                    raise
+            finally:
+                self._unlock_file(f)
+            self.unsynced += 1
+            if (self.unsynced >= self.fsync_every
+                    or time.monotonic() - self.last_sync >= self.fsync_interval):
+                self._sync_locked()
+        return offset
+
+    def sync(self):
+        with self.lock:
+            self._sync_locked()
+
+    def close(self):
+        with self.lock:
+            self._sync_locked()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def size(self):
+        """Current size of the journal file in bytes."""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def scan(self, start=0, finished_only=False):
+        """Yield (offset, end, entry) for each line from byte `start`.
+
+        `entry` is None for a damaged line. With `finished_only`, a last
+        line without its newline (another process is still writing it, or
+        a crash cut it off) is left for a later scan.
+        """
+        if not os.path.exists(self.path):
+            return
+        bad = 0
+        timing = METRICS.enabled
+        parse_seconds = 0.0
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                line_start = offset
+                offset += len(line)
+                if finished_only and not line.endswith(b'\n'):
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    if timing:
+                        t0 = time.perf_counter()
+                        entry = json.loads(line)
+                        parse_seconds += time.perf_counter() - t0
+                    else:
+                        entry = json.loads(line)
+                except ValueError:
+                    bad += 1
+                    entry = None
+                yield line_start, offset, entry
+        self.bad_lines = bad
+        METRICS.observe('load_saved_parse_seconds', parse_seconds)
+
+    def iter_with_offsets(self, start=0):
+        """Yield (offset, entry) pairs from byte `start`, skipping damaged lines."""
+        for offset, _, entry in self.scan(start):
+            if entry is not None:
+                yield offset, entry
+
+    def __iter__(self):
+        """Yield saved entries one at a time, skipping damaged lines."""
+        for _, entry in self.iter_with_offsets():
+            yield entry
+
+    def read_at(self, offset):
+        """Read the entry whose line starts at `offset`."""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def read_many(self, offsets):
+        """Read the entries at `offsets` with one open; None for damaged lines."""
+        entries = []
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                try:
+                    entries.append(json.loads(f.readline()))
+                except ValueError:
+                    entries.append(None)
+        return entries
+
+    def compact(self):
+        """Rewrite the journal keeping only the lines that parse.
+
+        This moves lines, so byte offsets taken before are no longer valid;
+        `generation` goes up so a SavedIndex knows to rebuild. Reading never
+        compacts by itself: get_index() does it when it finds damaged lines,
+        before anyone can read through the index. (It used to run on a
+        background thread, but then pages read meanwhile could come from
+        offsets into the old file.)
+        """
+        with self.lock:
+            self._sync_locked()
+            if not os.path.exists(self.path):
+                return
+            # hold the append lock on the old file until the new one is in
+            # place, so no other process appends a line that would be lost
+            f = self._lock_file()
+            try:
+                tmp_path = self.path + '.compact'
+                with open(self.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    for line in src:
+                        if not line.strip():
+                            continue
+                        try:
+                            json.loads(line)
+                        except ValueError:
+                            continue
+                        dst.write(line if line.endswith(b'\n') else line + b'\n')
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                if fcntl is None:
+                    # Windows can't replace a file that is open
+                    f.close()
+                    self.file = None
+                os.replace(tmp_path, self.path)
+            finally:
+                if self.file is not None:
+                    self._unlock_file(f)
+                    f.close()
+                    self.file = None
+            self.bad_lines = 0
+            self.generation += 1
+
+    def file_id(self):
+        """Identity of the journal file; changes when compact() replaces it."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return [st.st_dev, st.st_ino]
+
+
+_journal = None
+
+
+def get_journal():
+    """Return the shared Journal, creating it on first use."""
+    global _journal
+    if _journal is None:
+        _journal = Journal()
+        atexit.register(_journal.close)
+    return _journal
+
+
+# --- Search index over saved entries -------------------------------------
+# Maps each word to the entries that contain it, and keeps the entries in
+# timestamp order. It is updated on every save and written next to the
+# journal (on a background thread every INDEX_SNAPSHOT_EVERY saves, and at
+# exit), so it can be loaded again without re-reading every entry.
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _entry_tokens(entry):
+    """All distinct tokens in an entry's original text and suggestions."""
+    parts = [entry.get('original') or '']
+    suggestions = entry.get('suggestions')
+    if isinstance(suggestions, dict):
+        for value in suggestions.values():
+            if isinstance(value, str):
+                parts.append(value)
+            elif isinstance(value, TextSegments):
+                parts.extend(value)
+    elif isinstance(suggestions, str):
+        parts.append(suggestions)
+    tokens = set()
+    for part in parts:
+        if isinstance(part, str):
+            tokens.update(tokenize(part))
+    return tokens
+
+
+class SavedRecord:
+    """One saved entry as a small fixed-layout object (no per-entry dict)."""
+
+    __slots__ = ('entry_id', 'title', 'original', 'suggestions', 'timestamp')
+
+    def __init__(self, entry_id, title, original, suggestions, timestamp):
+        self.entry_id = entry_id
+        self.title = title
+        self.original = original
+        self.suggestions = suggestions
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_entry(cls, entry_id, entry):
+        if not isinstance(entry, dict):
+            return cls(entry_id, '(damaged entry)', '', None, 0)
+        # entries saved by other front ends may hold any JSON value here
+        title = entry.get('title') or 'untitled'
+        original = entry.get('original') or ''
+        timestamp = entry.get('timestamp')
+        return cls(entry_id, title if isinstance(title, str) else str(title),
+                   original if isinstance(original, str) else str(original),
+                   entry.get('suggestions'),
+                   timestamp if isinstance(timestamp, (int, float)) else 0)
+
+
+def _json_chunks(items, as_object=False):
+    """JSON text for a list (or, with as_object, a list of (word, ids) pairs
+    written as an object), about INDEX_SNAPSHOT_CHUNK numbers per json.dumps call."""
+    size = INDEX_SNAPSHOT_CHUNK
+    yield '{' if as_object else '['
+    chunk = []
+    weight = 0
+    first = True
+    for item in itertools.chain(items, [None]):
+        if item is not None:
+            chunk.append(item)
+            weight += len(item[1]) + 1 if as_object else 1
+            if weight < size:
+                continue
+        if chunk:
+            if not first:
+                yield ','
+            yield json.dumps(dict(chunk) if as_object else chunk, separators=(',', ':'))[1:-1]
+            first = False
+        chunk = []
+        weight = 0
+    yield '}' if as_object else ']'
+
+
+class SavedIndex:
+    """Inverted index (word -> entry ids) plus a timestamp-ordered list.
+
+    Entry ids are positions in the journal (0 = oldest); `offsets` maps an
+    id to the byte offset of its line, so entries can be read directly.
+    Offsets are only valid for one version of the journal file, so the
+    index remembers which (file identity and compaction generation) and
+    starts over when it changes.
+    """
+
+    VERSION = 2
+
+    def __init__(self, journal, path=INDEX_FILE, snapshot_every=INDEX_SNAPSHOT_EVERY):
+        self.journal = journal
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.lock = threading.Lock()
+        self.snapshot_lock = threading.Lock()  # one snapshot write at a time
+        self.snapshot_thread = None
+        self.resets = 0
+        self.catch_up_lock = threading.Lock()  # one catch_up at a time
+        self.catch_up_wanted = False
+        self.reset()
+
+    def reset(self):
+        self.postings = {}
+        self.offsets = []
+        self.by_time = []  # sorted (timestamp, entry id) pairs
+        self.journal_size = 0  # journal bytes already indexed
+        self.unsaved = 0
+        self.generation = self.journal.generation
+        self.file_id = None  # journal file the offsets belong to
+        self.resets += 1
+
+    def add(self, entry, offset, end=None):
+        """Index one entry. `end` is the journal size after its line."""
+        with self.lock:
+            entry_id = len(self.offsets)
+            self.offsets.append(offset)
+            for token in _entry_tokens(entry):
+                self.postings.setdefault(token, []).append(entry_id)
+            ts = entry.get('timestamp')
+            if not isinstance(ts, (int, float)):
+                ts = 0
+            # new entries are nearly always the newest, so this is an append
+            if not self.by_time or self.by_time[-1][0] <= ts:
+                self.by_time.append((ts, entry_id))
+            else:
+                bisect.insort(self.by_time, (ts, entry_id))
+            if end is not None:
+                self.journal_size = end
+            if self.file_id is None:
+                self.file_id = self.journal.file_id()
+            self.unsaved += 1
+        return entry_id
+
+    def is_stale(self):
+        """True if the journal was compacted or replaced since it was indexed."""
+        if self.generation != self.journal.generation:
+            return True
+        if self.file_id is None:
+            # offsets without a file to go with them can't be trusted
+            return self.journal_size > 0 or bool(self.offsets)
+        if self.file_id != self.journal.file_id():
+            return True
+        return self.journal.size() < self.journal_size
+
+    def catch_up(self):
+        """Index journal entries written since the index was last saved."""
+        with self.catch_up_lock:
+            self.catch_up_wanted = False
+            self._catch_up()
+        if self.catch_up_wanted:
+            self.request_catch_up()
+
+    def request_catch_up(self):
+        """Catch up like catch_up(), but never wait for another thread.
+
+        If a catch-up is already running (e.g. the index is being loaded
+        in the background), it is asked to go round once more instead.
+        """
+        self.catch_up_wanted = True
+        # after letting go of the lock, look again: a request may have come
+        # in just before that and found the lock taken
+        while self.catch_up_wanted and self.catch_up_lock.acquire(blocking=False):
+            try:
+                while self.catch_up_wanted:
+                    self.catch_up_wanted = False
+                    self._catch_up()
+            finally:
+                self.catch_up_lock.release()
+
+    def _catch_up(self):
+        if self.is_stale():
+            # the offsets point into an older file: start over
+            with self.lock:
+                self.reset()
+        file_id = self.journal.file_id()
+        # only move past lines actually read here (other processes may be
+        # writing to the same file)
+        end = self.journal_size
+        for offset, end, entry in self.journal.scan(self.journal_size, finished_only=True):
+            if entry is not None:
+                self.add(entry, offset)
+        with self.lock:
+            self.journal_size = end
+            if file_id is not None:
+                self.file_id = file_id
+        if self.unsaved >= self.snapshot_every:
+            self.save_in_background()
+
+    def load(self):
+        """Load the saved index (if it matches the journal) and catch up."""
+        data = None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            self.reset()
+            if isinstance(data, dict) and data.get('version') == self.VERSION:
+                self.postings = data['postings']
+                self.offsets = data['offsets']
+                self.by_time = [tuple(pair) for pair in data['by_time']]
+                self.journal_size = data['journal_size']
+                self.file_id = data['file_id']
+        self.catch_up()
+        return self
+
+    def save(self):
+        """Write the index next to the journal (atomically).
+
+        Only shallow copies are taken under the lock. The word lists only
+        ever grow at the end, so they are cut back to the entries copied.
+        Everything is encoded a chunk at a time with json.dumps: the C
+        encoder holds the GIL for a whole call, so one big call would stall
+        every other thread, the Tk one included.
+        """
+        import tempfile
+        with self.snapshot_lock:
+            with self.lock:
+                resets = self.resets
+                saved = self.unsaved
+                count = len(self.offsets)
+                head = {'version': self.VERSION, 'journal_size': self.journal_size,
+                        'file_id': self.file_id}
+                offsets = self.offsets[:]
+                by_time = self.by_time[:]
+                words = list(self.postings.items())
+            # ids added after the copy above belong to later entries
+            words = [(word, ids if ids[-1] < count else ids[:bisect.bisect_left(ids, count)])
+                     for word, ids in words]
+            parts = [json.dumps(head, separators=(',', ':'))[:-1], ',"offsets":']
+            parts.extend(_json_chunks(offsets))
+            parts.append(',"by_time":')
+            parts.extend(_json_chunks(by_time))
+            parts.append(',"postings":')
+            parts.extend(_json_chunks(words, as_object=True))
+            parts.append('}')
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.',
+                                            prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.writelines(parts)
+                with self.lock:
+                    if self.resets != resets:
+                        # rebuilt meanwhile: these offsets are for an older file
+                        os.unlink(tmp_path)
+                        return
+                    os.replace(tmp_path, self.path)
+                    self.unsaved -= saved
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+    def save_in_background(self):
+        """Start writing a snapshot on its own thread (if one isn't running)."""
+        thread = self.snapshot_thread
+        if thread is not None and thread.is_alive():
+            return
+        self.snapshot_thread = threading.Thread(target=self.save, name='index-snapshot', daemon=True)
+        self.snapshot_thread.start()
+
+    def close(self):
+        if self.snapshot_thread is not None:
+            self.snapshot_thread.join()
+        if self.unsaved:
+            self.save()
+
+    def search(self, query, limit=20):
+        """Ids of entries containing every word of `query`, newest first."""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        with self.lock:
+            lists = [self.postings.get(t, []) for t in tokens]
+            lists.sort(key=len)
+            if not lists[0]:
+                return []
+            found = set(lists[0])
+            for ids in lists[1:]:
+                found.intersection_update(ids)
+                if not found:
+                    return []
+        return sorted(found, reverse=True)[:limit]
+
+    def latest(self, n=10):
+        """Ids of the `n` newest entries by timestamp, newest first."""
+        with self.lock:
+            return [entry_id for _, entry_id in reversed(self.by_time[-n:])] if n > 0 else []
+
+    def get(self, entry_id):
+        """Read one entry from the journal by id."""
+        return self.journal.read_at(self.offsets[entry_id])
+
+    def count(self):
+        """Number of indexed entries."""
+        with self.lock:
+            return len(self.by_time)
+
+    def page(self, start, count):
+        """SavedRecords for rows start..start+count-1, newest first.
+
+        Only those entries are read, by seeking to their offsets.
+        """
+        with self.lock:
+            stop = max(0, len(self.by_time) - start)
+            ids = [entry_id for _, entry_id in reversed(self.by_time[max(0, stop - count):stop])]
+            offsets = [self.offsets[entry_id] for entry_id in ids]
+        entries = self.journal.read_many(offsets)
+        return [SavedRecord.from_entry(entry_id, entry) for entry_id, entry in zip(ids, entries)]
+
+
+_index = None
+_index_lock = threading.Lock()  # held while the index is loaded
+
+
+def loaded_index():
+    """The shared index if it is loaded already, else None (never loads it)."""
+    return _index
+
+
+def get_index():
+    """Return the shared SavedIndex, loading it on first use."""
+    global _index
+    with _index_lock:
+        if _index is not None:
+            return _index
+        journal = get_journal()
+        index = SavedIndex(journal).load()
+        if journal.bad_lines:
+            # drop damaged lines (e.g. from a crash) now, while nothing else
+            # holds offsets into the file, and index the new file
+            journal.compact()
+            index.catch_up()
+        atexit.register(index.close)
+        _index = index
+    # entries saved while it was loading (save_entry doesn't wait for that)
+    index.request_catch_up()
+    return index
+
+
+def load_saved():
+    """Yield saved entries, oldest first, without reading the whole file."""
+    return iter(get_journal())
+
+
+@timed('save_entry_seconds')
+def save_entry(title, original, suggestions):
+    entry = {
+        'title': title,
+        'original': original,
+        'suggestions': suggestions,
+        'timestamp': time.time(),
+    }
+    get_journal().append(entry)
+    # keep the search index up to date if it is in use; otherwise it
+    # catches up from the journal once it is loaded. Reading from the end
+    # of what it has indexed also picks up lines other processes wrote
+    # before this one (and re-indexes after compaction). If the index is
+    # busy (loading, on another thread) this doesn't wait: that thread
+    # indexes the new line too.
+    index = _index
+    if index is not None:
+        index.request_catch_up()
+    return entry
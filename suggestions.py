@@ -0,0 +1,265 @@
+"""The three suggestion styles (professional, neutral, cultural), worked out
+for a whole text, one sentence at a time, or all three in one pass.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from metrics import METRICS, timed
+from rulepack import Rewriter, load_rule_pack, match_case, trie_pattern
+
+INCREMENTAL_CACHE_SEGMENTS = 50000  # cached sentence results per style
+
+
+# Replacement rules used by the suggestion functions.
+# Keys are matched as whole words, ignoring case. These are the built-in
+# defaults; rules/<language>/<register>.tsv files replace them (see rulepack.py).
+PROFESSIONAL_REPLACEMENTS = {
+    "gonna": "going to",
+    "wanna": "want to",
+    "ok": "okay",
+    "yeah": "yes",
+    "thanks": "thank you",
+}
+
+CULTURAL_MAP = {
+    "buddy": "friend",
+    "dude": "person",
+    "mate": "friend (UK/AU)",
+}
+
+
+def _rules_for(register, builtin):
+    """The rule pack for `register` if its data file exists, else the built-in dict."""
+    try:
+        pack = load_rule_pack(register)
+    except (OSError, ValueError):
+        pack = None
+    return pack if pack is not None else builtin
+
+
+PROFESSIONAL_REWRITER = Rewriter(_rules_for('professional', PROFESSIONAL_REPLACEMENTS))
+CULTURAL_REWRITER = Rewriter(_rules_for('cultural', CULTURAL_MAP))
+
+
+CULTURAL_NOTE = "\n\nNote: Consider local greetings depending on the culture."
+
+
+def _professional_sentence(sentence: str) -> str:
+    """Professional style for one '.'-separated piece of text (the same as
+    professional_suggestion when no rule key or value contains '.')."""
+    return PROFESSIONAL_REWRITER.rewrite(sentence).strip().capitalize()
+
+
+def _cultural_sentence(sentence: str) -> str:
+    return CULTURAL_REWRITER.rewrite(sentence)
+
+
+def professional_suggestion(text: str) -> str:
+    result = PROFESSIONAL_REWRITER.rewrite(text)
+    # Capitalize sentence starts (very simple rule)
+    sentences = [s.strip().capitalize() for s in result.split('.')]
+    return '. '.join(s for s in sentences if s)
+
+
+def neutral_suggestion(text: str) -> str:
+    t = " ".join(text.split())
+    # Very small cleanup
+    t = t.replace(' ,', ',').replace(' .', '.')
+    return t
+
+
+def cultural_suggestion(text: str) -> str:
+    t = CULTURAL_REWRITER.rewrite(text)
+    return t + CULTURAL_NOTE
+
+
+# --- Incremental suggestions for long documents ---------------------------
+# Each style can be worked out one sentence at a time. The document is cut
+# into sentences at '.', each sentence's result is cached by its text,
+# and the results are joined back together. After a small edit only the
+# sentences that changed are rewritten again.
+
+def _split_sentences(text):
+    return text.split('.')
+
+
+def _splits_into_sentences(style):
+    """Whether rewriting `style` one sentence at a time gives the same result."""
+    if style == 'professional':
+        # professional splits *after* rewriting, so a '.' in a replacement counts
+        return not (PROFESSIONAL_REWRITER.has_period_keys or PROFESSIONAL_REWRITER.has_period_values)
+    if style == 'cultural':
+        return not CULTURAL_REWRITER.has_period_keys
+    return False
+
+
+def _join_professional(parts):
+    return '. '.join(p for p in parts if p)
+
+
+def _join_cultural(parts):
+    return '.'.join(parts) + CULTURAL_NOTE
+
+
+# style name -> (split text into segments, rewrite one segment, join results)
+# Neutral is not listed: its whole-text pass is a couple of C-level string
+# operations, so it is already cheaper than looking up every sentence.
+INCREMENTAL_STYLES = {
+    'professional': (_split_sentences, _professional_sentence, _join_professional),
+    'cultural': (_split_sentences, _cultural_sentence, _join_cultural),
+}
+SUGGESTION_FUNCTIONS = {
+    'professional': professional_suggestion,
+    'neutral': neutral_suggestion,
+    'cultural': cultural_suggestion,
+}
+
+
+class IncrementalSuggester:
+    """Gives the same results as the suggestion functions, sentence by sentence.
+
+    Results for each sentence are kept in a per-style LRU cache (up to
+    `max_segments` sentences per style), keyed by the sentence text.
+    """
+
+    def __init__(self, max_segments=INCREMENTAL_CACHE_SEGMENTS):
+        self.max_segments = max_segments
+        self.caches = {style: OrderedDict() for style in INCREMENTAL_STYLES}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def suggest(self, style, text):
+        if style not in INCREMENTAL_STYLES or not _splits_into_sentences(style):
+            # not split into sentences (see INCREMENTAL_STYLES)
+            return SUGGESTION_FUNCTIONS[style](text)
+        split, rewrite, join = INCREMENTAL_STYLES[style]
+        cache = self.caches[style]
+        parts = []
+        with self.lock:
+            for segment in split(text):
+                # the dict hashes the sentence text, so equal sentences share a result
+                result = cache.get(segment)
+                if result is None:
+                    self.misses += 1
+                    result = rewrite(segment)
+                    cache[segment] = result
+                    if len(cache) > self.max_segments:
+                        cache.popitem(last=False)
+                else:
+                    self.hits += 1
+                    cache.move_to_end(segment)
+                parts.append(result)
+        return join(parts)
+
+    def clear(self):
+        with self.lock:
+            for cache in self.caches.values():
+                cache.clear()
+
+
+_incremental = None
+
+
+def get_incremental_suggester():
+    """Return the shared IncrementalSuggester, creating it on first use."""
+    global _incremental
+    if _incremental is None:
+        _incremental = IncrementalSuggester()
+    return _incremental
+
+
+def _collect_gauges(metrics):
+    if _incremental is not None:
+        metrics.gauge('sentence_cache_hits', _incremental.hits)
+        metrics.gauge('sentence_cache_misses', _incremental.misses)
+
+
+METRICS.add_gauge_source(_collect_gauges)
+
+
+# --- All styles in one pass ----------------------------------------------
+# Comparing styles (the "Compare all" button, batch mode) needs all three
+# results for the same text. Instead of each style scanning the text on its
+# own, one regex with a capturing group splits the text (in C) into the
+# gaps and the rule words of either style. Each distinct rule word (as
+# written, so case is kept) is looked up once per process: its professional
+# and cultural output are remembered, and both texts are built by mapping
+# the words through those tables and joining. The professional sentence
+# clean-up then runs on the rewritten text. Neutral only collapses
+# whitespace, which str.split/join already does in one C pass; doing it in
+# the same Python-level traversal measured slower.
+
+ALL_STYLES_MEMO_SIZE = 4096  # rule words (as written) remembered for suggest_all
+
+_all_styles = None  # (scanner, {word: professional}, {word: cultural}), or False
+
+
+def _get_all_styles():
+    """The shared scanner and word tables, or None if the rules need the
+    plain functions (multi-word keys can overlap differently per style)."""
+    global _all_styles
+    if _all_styles is None:
+        rewriters = (PROFESSIONAL_REWRITER, CULTURAL_REWRITER)
+        if not all(r.single_words and not r.has_period_keys for r in rewriters):
+            _all_styles = False
+        elif not all(r.uses_regex() for r in rewriters):
+            # big rule packs are looked up word by word
+            _all_styles = (re.compile(r'(\w+)'), {}, {})
+        else:
+            keys = {k: None for r in rewriters for k in r.rules}
+            body = trie_pattern(keys) if keys else '(?!)'
+            scanner = re.compile(r'(?<!\w)(' + body + r')(?!\w)', re.IGNORECASE)
+            _all_styles = (scanner, {}, {})
+    return _all_styles or None
+
+
+def _remember_all_styles_words(words, professional, cultural):
+    """Fill in the outputs of words not seen before."""
+    if len(professional) > ALL_STYLES_MEMO_SIZE:
+        professional.clear()
+        cultural.clear()
+    professional_get = PROFESSIONAL_REWRITER.lookup
+    cultural_get = CULTURAL_REWRITER.lookup
+    for found in words:
+        if found in professional and found in cultural:
+            continue
+        key = found.lower()
+        new_p = professional_get(key)
+        new_c = cultural_get(key)
+        professional[found] = found if new_p is None else match_case(found, new_p)
+        cultural[found] = found if new_c is None else match_case(found, new_c)
+
+
+@timed('suggestion_seconds', style='all')
+def suggest_all(text: str) -> dict:
+    """Run all three suggestion styles on one text (one scan for rule words)."""
+    shared = _get_all_styles()
+    if shared is None:
+        return {name: func(text) for name, func in SUGGESTION_FUNCTIONS.items()}
+    scanner, professional, cultural = shared
+    # gaps at even positions, rule words at odd ones
+    parts = scanner.split(text)
+    if len(parts) > 1:
+        words = parts[1::2]
+        while True:
+            try:
+                professional_words = list(map(professional.__getitem__, words))
+                cultural_words = list(map(cultural.__getitem__, words))
+                break
+            except KeyError:
+                _remember_all_styles_words(words, professional, cultural)
+        rewritten = parts[:]
+        rewritten[1::2] = professional_words
+        professional_text = ''.join(rewritten)
+        rewritten[1::2] = cultural_words
+        cultural_text = ''.join(rewritten)
+    else:
+        professional_text = cultural_text = text
+    sentences = (s.strip().capitalize() for s in professional_text.split('.'))
+    return {
+        'professional': '. '.join(s for s in sentences if s),
+        'neutral': neutral_suggestion(text),
+        'cultural': cultural_text + CULTURAL_NOTE,
+    }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# make `import main` work when pytest runs from the project root or tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
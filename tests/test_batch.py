@@ -0,0 +1,39 @@
+"""Tests for headless batch mode (--batch)."""
+import json
+
+import pytest
+
+import batch
+import main
+import suggestions
+
+
+def test_two_workers_keep_input_order_and_report_bad_lines(tmp_path):
+    lines = [json.dumps({'request_id': f'r{n}', 'text': f'ok gonna send {n}'}) for n in range(7)]
+    lines[2] = '{not json'
+    lines[4] = json.dumps(['a list'])
+    lines[5] = json.dumps({'id': 9, 'title': 'no text here'})
+    source = tmp_path / 'in.jsonl'
+    # blank lines are skipped but still counted for the line numbers
+    source.write_text('\n'.join(lines[:3]) + '\n\n  \n' + '\n'.join(lines[3:]) + '\n', encoding='utf-8')
+    output = tmp_path / 'out.jsonl'
+
+    written = batch.run_batch(str(source), str(output), workers=2, chunk_size=1)
+
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert written == len(records) == 7
+    assert [r['line'] for r in records] == [1, 2, 3, 6, 7, 8, 9]
+    assert 'invalid JSON' in records[2]['error']
+    assert records[4]['error'] == 'record is not a JSON object'
+    assert records[5] == {'line': 8, 'error': 'no text field found'}
+    good = [r for r in records if 'error' not in r]
+    assert [r['request_id'] for r in good] == ['r0', 'r1', 'r3', 'r6']
+    assert good[-1]['professional'] == suggestions.suggest_all('ok gonna send 6')['professional']
+
+
+@pytest.mark.parametrize('flag', ['--workers', '--chunk-size'])
+@pytest.mark.parametrize('value', ['-1', '0', 'two'])
+def test_counts_must_be_positive(flag, value, capsys):
+    with pytest.raises(SystemExit):
+        main.parse_args(['--batch', 'in.jsonl', flag, value])
+    assert 'must be a positive integer' in capsys.readouterr().err
@@ -0,0 +1,121 @@
+"""Tests for the token diff behind the changed-word highlights."""
+import random
+
+import pytest
+
+import diff
+
+
+def check_opcodes(a, b):
+    """The opcodes must cover both lists in order and turn `a` into `b`."""
+    ops = diff.diff_tokens(a, b)
+    i = j = 0
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in ops:
+        assert (i1, j1) == (i, j), ops
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            rebuilt += a[i1:i2]
+        else:
+            assert tag in ('replace', 'delete', 'insert')
+            assert (i1 < i2) == (tag != 'insert') and (j1 < j2) == (tag != 'delete')
+            rebuilt += b[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    assert rebuilt == b
+    return ops
+
+
+def changed(ops):
+    return sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in ops if tag != 'equal')
+
+
+@pytest.mark.parametrize('a, b', [
+    ([], []),
+    ([], ['x', 'y']),
+    (['x', 'y'], []),
+    (['x'], ['x']),
+    (['x'], ['y']),
+    (list('abcabba'), list('cbabac')),
+])
+def test_small_cases(a, b):
+    check_opcodes(a, b)
+
+
+def test_random_edits():
+    rng = random.Random(3)
+    vocab = [f'w{n}' for n in range(40)]
+    for _ in range(200):
+        a = [rng.choice(vocab) for _ in range(rng.randint(0, 120))]
+        b = list(a)
+        for _ in range(rng.randint(0, 8)):
+            pos = rng.randint(0, len(b))
+            b[pos:pos + rng.randint(0, 3)] = [rng.choice(vocab) for _ in range(rng.randint(0, 3))]
+        check_opcodes(a, b)
+
+
+def test_random_edits_across_sentences():
+    rng = random.Random(4)
+    vocab = [f'w{n}' for n in range(40)] + ['.', '?!', '...']
+    for _ in range(200):
+        a = [rng.choice(vocab) for _ in range(rng.randint(0, 300))]
+        b = list(a)
+        for _ in range(rng.randint(0, 8)):
+            pos = rng.randint(0, len(b))
+            b[pos:pos + rng.randint(0, 6)] = [rng.choice(vocab) for _ in range(rng.randint(0, 6))]
+        check_opcodes(a, b)
+
+
+def test_low_vocabulary_text_stays_small():
+    rng = random.Random(5)
+    # long enough to need anchors, with no token unique on its own
+    a = [rng.choice('ab') for _ in range(3000)]
+    b = list(a)
+    b[1500] = 'c'
+    del b[700]
+    ops = check_opcodes(a, b)
+    assert changed(ops) <= 4
+
+
+def test_ranges_cover_only_the_changed_words():
+    original = 'ok gonna send it.\n thanks buddy'
+    suggestion = 'Okay going to send it.\n thank you friend'
+    removed, added = diff.diff_ranges(original, suggestion)
+    assert [original[s:e] for s, e in removed] == ['ok gonna', 'thanks buddy']
+    assert [suggestion[s:e] for s, e in added] == ['Okay going to', 'thank you friend']
+    assert diff.diff_ranges('', 'new words') == ([], [(0, 9)])
+    assert diff.diff_ranges('old words', '') == ([(0, 9)], [])
+
+
+def test_capitalisation_changes_are_highlighted_without_breaking_matches():
+    original = 'ok it works. it is fine. so we ship'
+    suggestion = 'Okay it works. It is fine. So we ship'
+    removed, added = diff.diff_ranges(original, suggestion)
+    assert [original[s:e] for s, e in removed] == ['ok', 'it', 'so']
+    assert [suggestion[s:e] for s, e in added] == ['Okay', 'It', 'So']
+    # a changed capital next to a rewritten word is one range
+    assert diff.diff_ranges('ok fine', 'Okay Fine') == ([(0, 7)], [(0, 9)])
+
+
+def naive_indices(text, ranges, shift=0):
+    indices = []
+    for start, end in ranges:
+        for offset in (start + shift, end + shift):
+            before = text[:offset]
+            indices.append(f'{before.count(chr(10)) + 1}.{offset - (before.rfind(chr(10)) + 1)}')
+    return indices
+
+
+@pytest.mark.parametrize('pieces', [
+    ['ab\ncd\n\nef'],
+    ['ab', '\ncd', '\n', '\nef'],
+    ['a', 'b\nc', 'd\n\ne', 'f', ''],
+])
+def test_text_indices_across_lines_and_segments(pieces):
+    text = ''.join(pieces)
+    ranges = [(0, 1), (1, 3), (2, 3), (3, 6), (6, 7), (7, 9), (9, 9)]
+    assert diff.text_indices(pieces, ranges) == naive_indices(text, ranges)
+    # offsets into the text after the first two characters
+    shifted = [(s, e) for s, e in ranges if e + 2 <= len(text)]
+    assert diff.text_indices(pieces, shifted, shift=2) == naive_indices(text, shifted, shift=2)
+    assert diff.text_indices(pieces, [(1, 4)]) == ['1.1', '2.1']
@@ -0,0 +1,30 @@
+"""Tests for the shared image cache."""
+import pytest
+
+import images
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def test_logo_is_decoded_once_for_every_size(tmp_path, monkeypatch):
+    logo = tmp_path / 'logo.png'
+    Image.new('RGBA', (420, 200), (127, 166, 173, 255)).save(logo)
+    monkeypatch.setattr(images, 'LOGO_PATH', str(logo))
+    cache = images.ImageCache(disk_dir=None)
+    monkeypatch.setattr(images, '_image_cache', cache)
+    # the header logo first (load_logo), then the window icon (load_nav_icons)
+    header = images.logo_thumbnail((48, 48))
+    icon = images.logo_thumbnail((64, 64))
+    assert cache.decodes == 1
+    assert header.size[0] <= 48 and header.size[1] <= 48
+    assert max(icon.size) == 64
+
+
+def test_thumbnails_for_several_boxes_share_one_decode(tmp_path):
+    photo = tmp_path / 'photo.jpg'
+    Image.new('RGB', (1600, 1200), (200, 100, 50)).save(photo)
+    cache = images.ImageCache(disk_dir=None)
+    small, large = cache.thumbnails(str(photo), [(48, 48), (360, 200)])
+    assert cache.decodes == 1
+    assert max(small.size) == 48 and large.size[1] == 200
+    assert cache.thumbnail(str(photo), (48, 48)) is small and cache.decodes == 1
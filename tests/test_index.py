@@ -0,0 +1,225 @@
+"""Tests for the search index over saved entries (offsets into the journal)."""
+import atexit
+import threading
+
+import pytest
+
+import storage
+
+
+def make(tmp_path):
+    journal = storage.Journal(path=str(tmp_path / 'saved.jsonl'), legacy_path=None)
+    index = storage.SavedIndex(journal, path=str(tmp_path / 'saved.index.json'))
+    return journal, index
+
+
+def save(journal, index, n):
+    entry = {'title': f't{n}', 'original': f'text {n}', 'timestamp': 1000 + n}
+    offset = journal.append(entry)
+    index.add(entry, offset, journal.size())
+
+
+def titles(index):
+    return [rec.title for rec in index.page(0, 100)]
+
+
+@pytest.fixture
+def app_files(tmp_path, monkeypatch):
+    """The app's default file names inside tmp_path, with fresh shared objects.
+
+    What get_journal()/get_index() register to run at exit runs at the end
+    of the test instead, while the files are still the test's own.
+    """
+    monkeypatch.chdir(tmp_path)
+    at_exit = []
+    monkeypatch.setattr(atexit, 'register', lambda func, *args: at_exit.append((func, args)))
+    monkeypatch.setattr(storage, '_journal', None)
+    monkeypatch.setattr(storage, '_index', None)
+    yield tmp_path
+    for func, args in reversed(at_exit):
+        func(*args)
+
+
+def test_damaged_line_then_more_saves(app_files, monkeypatch):
+    journal = storage.Journal(legacy_path=None)
+    index = storage.SavedIndex(journal).load()
+    for n in range(3):
+        save(journal, index, n)
+    index.save()
+    journal.close()
+    # a crash leaves half a line behind
+    with open(journal.path, 'ab') as f:
+        f.write(b'{"title": "half')
+
+    # next session, through the shared objects the app uses
+    monkeypatch.setattr(storage, '_journal', storage.Journal(legacy_path=None))
+    index = storage.get_index()
+    for n in range(3, 6):
+        storage.save_entry(f't{n}', f'text {n}', {})
+    assert titles(index) == ['t5', 't4', 't3', 't2', 't1', 't0']
+    assert index.get(5)['title'] == 't5'
+    index.close()
+    storage._journal.close()
+
+    # and the session after that loads a snapshot that matches the file
+    journal = storage.Journal(legacy_path=None)
+    index = storage.SavedIndex(journal).load()
+    assert titles(index) == ['t5', 't4', 't3', 't2', 't1', 't0']
+    assert index.get(5)['title'] == 't5'
+    assert journal.bad_lines == 0
+
+
+def test_rebuilds_after_compaction(tmp_path):
+    journal, index = make(tmp_path)
+    index.load()
+    for n in range(3):
+        save(journal, index, n)
+    index.save()
+    journal.close()
+    with open(journal.path, 'ab') as f:
+        f.write(b'garbage\n')
+    journal.compact()
+    # more entries than the compaction removed, so the size alone looks fine
+    for n in range(3, 8):
+        journal.append({'title': f't{n}', 'timestamp': 1000 + n})
+    journal.close()
+
+    _, fresh = make(tmp_path)
+    fresh.load()
+    assert titles(fresh) == [f't{n}' for n in range(7, -1, -1)]
+    assert [fresh.get(i)['title'] for i in range(8)] == [f't{n}' for n in range(8)]
+
+
+def test_reading_does_not_compact(tmp_path):
+    journal, _ = make(tmp_path)
+    journal.append({'n': 1})
+    journal.close()
+    with open(journal.path, 'ab') as f:
+        f.write(b'not json\n')
+    before = open(journal.path, 'rb').read()
+    assert [e['n'] for e in journal] == [1]
+    assert journal.bad_lines == 1
+    assert open(journal.path, 'rb').read() == before
+
+
+def test_records_from_other_front_ends_have_string_fields(tmp_path):
+    journal, index = make(tmp_path)
+    for entry in ({'title': 42, 'original': ['a', 'list'], 'timestamp': 'soon'},
+                  {'title': None, 'original': {'text': 'hi'}}):
+        journal.append(entry)
+    index.catch_up()
+    first, second = sorted(index.page(0, 10), key=lambda rec: rec.entry_id)
+    assert (first.title, first.original, first.timestamp) == ('42', "['a', 'list']", 0)
+    assert (second.title, second.original) == ('untitled', "{'text': 'hi'}")
+
+
+def test_save_while_index_loads_is_indexed_once(app_files, monkeypatch):
+    monkeypatch.setattr(storage, '_journal', storage.Journal(legacy_path=None))
+    load = storage.SavedIndex.load
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load(self):
+        loading.set()
+        release.wait(5)
+        return load(self)
+    monkeypatch.setattr(storage.SavedIndex, 'load', slow_load)
+
+    loader = threading.Thread(target=storage.get_index)
+    loader.start()
+    loading.wait(5)
+    # saving doesn't wait for the load (the Tk thread calls save_entry)
+    saver = threading.Thread(target=storage.save_entry, args=('during', 'saved while loading', {}))
+    saver.start()
+    saver.join(5)
+    assert not saver.is_alive() and loader.is_alive()
+    release.set()
+    loader.join()
+    assert titles(storage.get_index()) == ['during']
+
+
+def test_save_during_a_catch_up_is_not_lost(tmp_path):
+    journal, index = make(tmp_path)
+    index.load()
+    journal.append({'title': 'first', 'timestamp': 1})
+    # another thread is in the middle of catching up
+    with index.catch_up_lock:
+        journal.append({'title': 'second', 'timestamp': 2})
+        index.request_catch_up()  # returns at once, leaving a note
+        assert index.count() == 0 and index.catch_up_wanted
+    # the next catch-up (here: a blocking one) sees both lines
+    index.catch_up()
+    assert titles(index) == ['second', 'first']
+    assert not index.catch_up_wanted
+
+
+def test_snapshot_written_in_chunks_loads_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'INDEX_SNAPSHOT_CHUNK', 3)
+    journal, index = make(tmp_path)
+    for n in range(20):
+        save(journal, index, n)
+    index.save()
+    assert index.unsaved == 0
+    _, fresh = make(tmp_path)
+    fresh.load()
+    assert fresh.postings == index.postings
+    assert fresh.offsets == index.offsets and fresh.by_time == index.by_time
+    assert titles(fresh) == [f't{n}' for n in range(19, -1, -1)]
+
+
+def test_save_entry_leaves_the_snapshot_to_a_thread(app_files, monkeypatch):
+    journal = storage.Journal(legacy_path=None)
+    index = storage.SavedIndex(journal, snapshot_every=3).load()
+    monkeypatch.setattr(storage, '_journal', journal)
+    monkeypatch.setattr(storage, '_index', index)
+    writers = []
+    save_snapshot = storage.SavedIndex.save
+
+    def recording_save(self):
+        writers.append(threading.current_thread().name)
+        save_snapshot(self)
+    monkeypatch.setattr(storage.SavedIndex, 'save', recording_save)
+    for n in range(4):
+        storage.save_entry(f't{n}', 'text', {})
+    index.close()
+    journal.close()
+    assert writers[0] == 'index-snapshot'
+    assert index.unsaved == 0
+
+
+def test_index_picks_up_lines_from_another_writer(tmp_path):
+    journal, index = make(tmp_path)
+    index.load()
+    other = storage.Journal(path=journal.path, legacy_path=None)
+    journal.append({'title': 'mine 1', 'timestamp': 1})
+    other.append({'title': 'theirs', 'timestamp': 2})
+    journal.append({'title': 'mine 2', 'timestamp': 3})
+    index.catch_up()
+    assert titles(index) == ['mine 2', 'theirs', 'mine 1']
+    assert [index.get(i)['title'] for i in range(3)] == ['mine 1', 'theirs', 'mine 2']
+    # half a line from a writer still at work is not indexed (or skipped) yet
+    with open(journal.path, 'ab') as f:
+        f.write(b'{"title": "la')
+    index.catch_up()
+    assert index.count() == 3 and index.journal_size == journal.size() - len(b'{"title": "la')
+    journal.close()
+    other.close()
+
+
+def test_snapshot_without_file_identity_is_rebuilt(tmp_path):
+    journal, index = make(tmp_path)
+    index.load()  # no journal file yet
+    assert index.file_id is None
+    save(journal, index, 0)
+    assert index.file_id == journal.file_id()
+
+    # an older snapshot that never learned its file, for a different journal
+    index.file_id = None
+    index.save()
+    journal.close()
+    other = tmp_path / 'other.jsonl'
+    other.write_bytes(b'{"title": "unrelated", "timestamp": 5}\n')
+    other.replace(journal.path)
+    _, fresh = make(tmp_path)
+    fresh.load()
+    assert titles(fresh) == ['unrelated']
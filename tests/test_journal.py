@@ -0,0 +1,109 @@
+"""Tests for the saved-entries journal (append-only JSONL file)."""
+import json
+
+import storage
+
+
+def make_journal(tmp_path, **kwargs):
+    kwargs.setdefault('legacy_path', None)
+    return storage.Journal(path=str(tmp_path / 'saved.jsonl'), **kwargs)
+
+
+def test_migrates_legacy_file_once(tmp_path):
+    legacy = tmp_path / 'saved_texts.json'
+    legacy.write_text(json.dumps([{'title': 'a'}, {'title': 'b'}]), encoding='utf-8')
+    journal = make_journal(tmp_path, legacy_path=str(legacy))
+    assert [e['title'] for e in journal] == ['a', 'b']
+    assert legacy.exists()  # the old file is left alone
+
+    # a second start must not copy the entries again
+    journal.append({'title': 'c'})
+    journal.close()
+    again = make_journal(tmp_path, legacy_path=str(legacy))
+    assert [e['title'] for e in again] == ['a', 'b', 'c']
+
+
+def test_torn_last_line_is_skipped_and_next_entry_starts_on_new_line(tmp_path):
+    path = tmp_path / 'saved.jsonl'
+    path.write_bytes(b'{"title": "ok"}\n{"title": "half')
+    journal = make_journal(tmp_path)
+    offset = journal.append({'title': 'after'})
+    journal.close()
+    titles = [e['title'] for _, e in journal.iter_with_offsets()]
+    assert titles == ['ok', 'after']
+    assert journal.bad_lines == 1
+    assert journal.read_at(offset)['title'] == 'after'
+
+
+def test_append_returns_offsets_for_read_at(tmp_path):
+    journal = make_journal(tmp_path)
+    offsets = [journal.append({'n': i}) for i in range(5)]
+    journal.close()
+    assert [journal.read_at(o)['n'] for o in offsets] == list(range(5))
+    assert [e['n'] for e in journal.read_many(offsets[::-1])] == [4, 3, 2, 1, 0]
+
+
+def test_segments_round_trip(tmp_path):
+    text = ''.join(['ok "quoted"\n', 'tab\there ', 'é ü 😀 ', 'back\\slash '] * 3000)
+    segments = storage.split_segments(text, size=1000)
+    assert ''.join(segments) == text
+    assert all(len(s) <= 1000 for s in segments)
+
+    journal = make_journal(tmp_path)
+    entry = {'title': 't', 'suggestions': {'preview': segments, 'n': 1}, 'empty': storage.TextSegments()}
+    offset = journal.append(entry)
+    journal.close()
+    stored = journal.read_at(offset)
+    assert stored['suggestions'] == {'preview': text, 'n': 1}
+    assert stored['empty'] == ''
+    # the streamed bytes are the same JSON as writing the joined string
+    streamed = b''.join(storage._encode_json(entry))
+    assert json.loads(streamed) == json.loads(json.dumps(
+        {'title': 't', 'suggestions': {'preview': text, 'n': 1}, 'empty': ''}))
+
+
+def test_failed_append_leaves_no_partial_line(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append({'n': 1})
+    try:
+        journal.append({'preview': storage.TextSegments(['abc']), 'bad': object()})
+    except TypeError:
+        pass
+    journal.append({'n': 2})
+    journal.close()
+    assert [e['n'] for e in journal] == [1, 2]
+    assert journal.bad_lines == 0
+
+
+def test_two_writers_get_true_offsets(tmp_path):
+    # the window and --serve each have their own Journal on the same file
+    first = make_journal(tmp_path)
+    second = make_journal(tmp_path)
+    offsets = [first.append({'n': 0}), second.append({'n': 1}), first.append({'n': 2})]
+    assert len(set(offsets)) == 3
+    assert [first.read_at(o)['n'] for o in offsets] == [0, 1, 2]
+    first.close()
+    second.close()
+
+
+def test_writer_follows_compaction_by_another_journal(tmp_path):
+    first = make_journal(tmp_path)
+    first.append({'n': 0})
+    with open(first.path, 'ab') as f:
+        f.write(b'damaged\n')
+    other = make_journal(tmp_path)
+    other.compact()
+    # still holding the old (replaced) file open, the next write must go to the new one
+    offset = first.append({'n': 1})
+    first.close()
+    assert [e['n'] for e in other] == [0, 1]
+    assert other.read_at(offset)['n'] == 1
+
+
+def test_scan_leaves_an_unfinished_last_line(tmp_path):
+    path = tmp_path / 'saved.jsonl'
+    path.write_bytes(b'{"n": 0}\nbad\n{"n": 1')
+    journal = make_journal(tmp_path)
+    lines = list(journal.scan(finished_only=True))
+    assert [(entry or {}).get('n') for _, _, entry in lines] == [0, None]
+    assert lines[-1][1] == len(b'{"n": 0}\nbad\n')
@@ -0,0 +1,45 @@
+"""Tests for --profile: the wrapped function must be the one that runs."""
+import atexit
+import pstats
+
+import pytest
+
+import metrics
+import suggestions
+
+
+@pytest.fixture
+def profile_at_exit(monkeypatch):
+    """Collect the atexit dumps instead of running them at interpreter exit."""
+    dumps = []
+    monkeypatch.setattr(metrics, '_profiler', None)
+    monkeypatch.setattr(atexit, 'register', lambda func, *args: dumps.append((func, args)))
+    monkeypatch.setattr(suggestions, 'INCREMENTAL_STYLES', dict(suggestions.INCREMENTAL_STYLES))
+    monkeypatch.setattr(suggestions, 'SUGGESTION_FUNCTIONS', dict(suggestions.SUGGESTION_FUNCTIONS))
+    # enable_profiling swaps the function in every module that imported it
+    for module in metrics._app_modules():
+        for name in ('_professional_sentence', 'professional_suggestion'):
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, getattr(module, name))
+
+    def run_dumps():
+        for func, args in dumps:
+            func(*args)
+    return run_dumps
+
+
+def test_profiles_the_incremental_path(tmp_path, profile_at_exit):
+    path = tmp_path / 'sentence.prof'
+    metrics.enable_profiling('_professional_sentence', str(path))
+    suggestions.IncrementalSuggester().suggest('professional', 'ok gonna send it. thx')
+    profile_at_exit()
+    stats = pstats.Stats(str(path))
+    assert any(func[2] == '_professional_sentence' for func in stats.stats)
+
+
+def test_uncalled_function_writes_no_file(tmp_path, profile_at_exit, capsys):
+    path = tmp_path / 'unused.prof'
+    metrics.enable_profiling('professional_suggestion', str(path))
+    profile_at_exit()
+    assert not path.exists()
+    assert 'never called' in capsys.readouterr().err
@@ -0,0 +1,62 @@
+"""Tests for the SQLite-backed suggestion result cache."""
+import sqlite3
+
+import result_cache
+
+
+def compute(style, text):
+    return f'{style}:{text.upper()}'
+
+
+def test_writes_are_batched_and_survive_close(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = result_cache.SuggestionCache(path=path)
+    for i in range(10):
+        assert cache.get('professional', f'text {i}', compute) == f'professional:TEXT {i}'
+    # ten misses in a row are one pending batch, not ten commits
+    assert cache.stats['commits'] == 0
+    assert cache.get('professional', 'text 3', compute) == 'professional:TEXT 3'
+    cache.close()
+    assert cache.stats['commits'] == 1
+
+    again = result_cache.SuggestionCache(path=path)
+    calls = []
+    result = again.get('professional', 'text 7', lambda style, text: calls.append(text))
+    assert result == 'professional:TEXT 7' and calls == []
+    assert again.stats['disk_hits'] == 1
+    again.close()
+
+
+def test_flushes_after_enough_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'RESULT_CACHE_FLUSH_EVERY', 4)
+    cache = result_cache.SuggestionCache(path=str(tmp_path / 'cache.sqlite3'))
+    for i in range(9):
+        cache.get('neutral', str(i), compute)
+    assert cache.stats['commits'] == 2
+    assert len(cache.pending_rows) == 1
+    cache.close()
+
+
+def test_last_used_only_refreshed_when_old(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = result_cache.SuggestionCache(path=path)
+    cache.get('cultural', 'hello', compute)
+    cache.close()
+    key = cache.make_key('cultural', 'hello')
+
+    def last_used():
+        with sqlite3.connect(path) as db:
+            return db.execute('SELECT last_used FROM results WHERE key = ?', (key,)).fetchone()[0]
+
+    recent = last_used()
+    cache = result_cache.SuggestionCache(path=path)
+    cache.get('cultural', 'hello', compute)
+    cache.close()
+    assert last_used() == recent  # fresh enough: no write
+
+    with sqlite3.connect(path) as db:
+        db.execute('UPDATE results SET last_used = ?', (recent - 2 * result_cache.RESULT_CACHE_TOUCH_AFTER,))
+    cache = result_cache.SuggestionCache(path=path)
+    cache.get('cultural', 'hello', compute)
+    cache.close()
+    assert last_used() > recent - result_cache.RESULT_CACHE_TOUCH_AFTER
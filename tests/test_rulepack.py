@@ -0,0 +1,74 @@
+"""Tests for compiled rule packs and the Rewriter built on them."""
+import os
+
+import rulepack
+
+
+RULES = {'ok': 'okay', 'gonna': 'going to', 'thank you': 'many thanks',
+         'thank you so much': 'thanks a lot', 'asap': 'as soon as possible'}
+TEXTS = ['', 'OK gonna go', 'thank you so much. Thank you  so much', 'thank youu ok_ok book',
+         'Asap!\nthank\tyou ok', 'thank you so', 'ÉOK ok-ok ok.ok']
+
+
+def write_pack(tmp_path, rules, extra_lines=()):
+    source = tmp_path / 'rules.tsv'
+    lines = [f'{k}\t{v}' for k, v in rules.items()] + list(extra_lines)
+    source.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return rulepack.RulePack(rulepack.compile_rule_pack(str(source)))
+
+
+def test_bad_keys_are_skipped_with_a_warning(tmp_path, capsys):
+    pack = write_pack(tmp_path, RULES, ["y'all\tyou all", 'thx!\tthanks', '  Thank   You  \tthanks'])
+    keys = dict(pack.items())
+    assert "y'all" not in keys and 'thx!' not in keys
+    assert keys['thank you'] == 'thanks'
+    err = capsys.readouterr().err
+    assert "y'all" in err and 'thx!' in err
+
+
+def test_compile_leaves_no_temporary_files(tmp_path):
+    write_pack(tmp_path, RULES)
+    assert sorted(os.listdir(tmp_path)) == ['rules.rulepack', 'rules.tsv']
+
+
+def test_regex_and_lookup_paths_agree(tmp_path, monkeypatch):
+    pack = write_pack(tmp_path, RULES)
+    with_dict = rulepack.Rewriter(RULES)
+    with_regex = rulepack.Rewriter(pack)
+    assert with_regex.uses_regex()
+    monkeypatch.setattr(rulepack, 'RULEPACK_REGEX_MAX_KEYS', 1)
+    by_word = rulepack.Rewriter(pack)
+    assert not by_word.uses_regex()
+    for text in TEXTS:
+        expected = with_dict.rewrite(text)
+        assert with_regex.rewrite(text) == expected, text
+        assert by_word.rewrite(text) == expected, text
+
+
+def test_read_only_rules_dir_reuses_one_cached_pack(tmp_path, monkeypatch):
+    import tempfile
+    rules_dir = tmp_path / 'rules'
+    (rules_dir / 'en').mkdir(parents=True)
+    (rules_dir / 'en' / 'professional.tsv').write_text('ok\tokay\n', encoding='utf-8')
+    monkeypatch.setattr(tempfile, 'gettempdir', lambda: str(tmp_path / 'tmp'))
+    compiled = []
+    compile_rule_pack = rulepack.compile_rule_pack
+
+    def read_only_compile(source, pack_path=None):
+        if str(rules_dir) in pack_path:
+            raise PermissionError(pack_path)
+        compiled.append(pack_path)
+        return compile_rule_pack(source, pack_path)
+    monkeypatch.setattr(rulepack, 'compile_rule_pack', read_only_compile)
+
+    paths = [rulepack.load_rule_pack('professional', 'en', str(rules_dir)).path for _ in range(3)]
+    assert len(set(paths)) == 1 and len(compiled) == 1
+    assert os.listdir(tmp_path / 'tmp' / 'lingrow-rulepacks') == [os.path.basename(paths[0])]
+
+
+def test_big_packs_stay_on_the_mapped_file(tmp_path):
+    rules = {f'word{n}': f'w{n}' for n in range(rulepack.RULEPACK_REGEX_MAX_KEYS + 1)}
+    rewriter = rulepack.Rewriter(write_pack(tmp_path, rules))
+    # no per-process dict or regex: lookups go to the shared mapping
+    assert not rewriter.uses_regex() and rewriter.rules is None
+    assert rewriter.rewrite('Word7 and word70') == 'W7 and w70'
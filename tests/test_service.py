@@ -0,0 +1,58 @@
+"""Tests for request validation in the local suggestion service."""
+import asyncio
+import json
+
+import pytest
+
+import service
+
+
+async def exchange(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def request(path, body, length=None):
+    if length is None:
+        length = len(body)
+    return (f'POST {path} HTTP/1.1\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n'
+            .encode('latin-1') + body)
+
+
+def run_with_service(tmp_path, monkeypatch, *raws):
+    monkeypatch.chdir(tmp_path)
+
+    async def go():
+        running = await service.SuggestionService(port=0).start()
+        try:
+            return [await exchange(running.port, raw) for raw in raws], dict(running.stats)
+        finally:
+            running.server.close()
+            for task in running.tasks:
+                task.cancel()
+            running.save_executor.shutdown(wait=True)
+    return asyncio.run(go())
+
+
+@pytest.mark.parametrize('payload', [
+    {'title': 3, 'original': 'hi'},
+    {'title': 'ok', 'original': ['hi']},
+    {'title': 'ok', 'original': 'hi', 'suggestions': 'nope'},
+    {'title': 'ok', 'original': 'hi', 'suggestions': {'professional': 1}},
+])
+def test_save_rejects_wrong_types(tmp_path, monkeypatch, payload):
+    body = json.dumps(payload).encode('utf-8')
+    [(status, reply)], stats = run_with_service(tmp_path, monkeypatch, request('/save', body))
+    assert status == 400 and 'error' in reply
+    assert stats['saves'] == 0
+
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_bad_content_length_gets_400(tmp_path, monkeypatch, length):
+    [(status, reply)], _ = run_with_service(tmp_path, monkeypatch, request('/suggest', b'{}', length))
+    assert status == 400 and 'Content-Length' in reply['error']
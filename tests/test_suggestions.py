@@ -0,0 +1,74 @@
+"""The different ways of getting suggestions must agree with the plain functions."""
+import random
+
+import pytest
+
+import rulepack
+import suggestions
+
+
+TEXTS = [
+    '',
+    'ok',
+    'ok gonna go. thanks buddy',
+    '  yeah , sure .  mate wanna come.. OK!',
+    'Thanks. THANKS. thanks dude\nok\n\n. .',
+    'book booking ok_ok ok2 okay',
+    'asap please. asap',
+]
+
+
+def random_texts(n=300, seed=7):
+    rng = random.Random(seed)
+    words = ['ok', 'OK', 'Ok', 'gonna', 'yeah', 'book', 'thanks', 'buddy', 'Mate', 'asap',
+             'ASAP', 'é', 'thank you', ' ', '  ', '.', ',', ' ,', ' .', '\n', '!']
+    return [''.join(rng.choice(words) for _ in range(rng.randint(0, 30))) for _ in range(n)]
+
+
+def plain(text):
+    return {name: func(text) for name, func in suggestions.SUGGESTION_FUNCTIONS.items()}
+
+
+def check_all_agree(texts):
+    incremental = suggestions.IncrementalSuggester()
+    for text in texts:
+        expected = plain(text)
+        assert suggestions.suggest_all(text) == expected, text
+        for style, value in expected.items():
+            assert incremental.suggest(style, text) == value, (style, text)
+            # second time from the sentence cache
+            assert incremental.suggest(style, text) == value, (style, text)
+
+
+@pytest.fixture
+def rules(monkeypatch):
+    """Swap in other rule dicts for one test."""
+    def use(professional=None, cultural=None):
+        if professional is not None:
+            monkeypatch.setattr(suggestions, 'PROFESSIONAL_REWRITER', rulepack.Rewriter(professional))
+        if cultural is not None:
+            monkeypatch.setattr(suggestions, 'CULTURAL_REWRITER', rulepack.Rewriter(cultural))
+        monkeypatch.setattr(suggestions, '_all_styles', None)
+    return use
+
+
+def test_shipped_rules_agree():
+    check_all_agree(TEXTS + random_texts())
+
+
+def test_builtin_dict_rules_agree(rules):
+    rules(suggestions.PROFESSIONAL_REPLACEMENTS, suggestions.CULTURAL_MAP)
+    check_all_agree(TEXTS + random_texts())
+
+
+def test_replacement_with_period(rules):
+    rules(dict(suggestions.PROFESSIONAL_REPLACEMENTS, asap='as soon as possible. please'))
+    assert suggestions.professional_suggestion('asap ok') == 'As soon as possible. Please okay'
+    check_all_agree(TEXTS + random_texts())
+
+
+def test_keys_with_period_and_phrases(rules):
+    rules({'e.g.': 'for example', 'thank you': 'many thanks', 'ok': 'okay'},
+          {'mate.': 'friend.', 'buddy': 'friend'})
+    assert suggestions.professional_suggestion('e.g. this') == 'For example this'
+    check_all_agree(TEXTS + random_texts())